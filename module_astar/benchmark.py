@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from cores import AStarSolver, JPSSolver, BidirectionalAStarSolver, TRACE_COUNTERS
+from helpers import GridMap
+
+# Các chế độ solver được so sánh: tên -> hàm tạo solver từ bản đồ
+MODES = {
+    'astar': lambda maze: AStarSolver(maze, trace=TRACE_COUNTERS),
+    'bucket': lambda maze: AStarSolver(maze, trace=TRACE_COUNTERS, open_list='bucket'),
+    'weighted2': lambda maze: AStarSolver(maze, trace=TRACE_COUNTERS, weight=2),
+    'jps': lambda maze: JPSSolver(maze, trace=TRACE_COUNTERS),
+    'bidirectional': lambda maze: BidirectionalAStarSolver(maze, trace=TRACE_COUNTERS),
+}
+
+def make_queries(maze, count, seed):
+    """
+    Chọn các cặp (start, goal) trên ô trống, tái lập được theo seed.
+    Cặp đầu tiên luôn là map.start / map.goal.
+    """
+    rng = random.Random(seed)
+    free = np.flatnonzero(maze.obstacles == 0)
+    pairs = [(maze.start, maze.goal)]
+    while len(pairs) < count:
+        a, b = (maze.to_pos(int(free[rng.randrange(free.size)])) for _ in range(2))
+        pairs.append((a, b))
+    return pairs
+
+def run_case(maze, mode, pairs, repeat=1, measure_memory=True):
+    """
+    Đo một chế độ solver trên một bản đồ.
+    Args:
+        maze: GridMap.
+        mode: Tên chế độ trong MODES.
+        pairs: Danh sách (start, goal).
+        repeat: Số lần chạy lại mỗi truy vấn, lấy thời gian nhỏ nhất.
+        measure_memory: Chạy thêm một lượt dưới tracemalloc để đo bộ nhớ đỉnh
+                        (tách riêng vì tracemalloc làm chậm phép đo thời gian).
+    Returns: dict kết quả tổng hợp của các truy vấn.
+    """
+    solver = MODES[mode](maze)
+    solver.solve(*pairs[0]) # Khởi động: cấp phát SearchState, nạp mảng vật cản
+    total_time = 0.0
+    expanded = pushes = stale = 0
+    lengths = []
+    found = 0
+    for start, goal in pairs:
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            path, _ = solver.solve(start, goal)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        stats = solver.stats
+        total_time += best
+        expanded += stats['expanded']
+        pushes += stats['pushes']
+        stale += stats['stale_pops']
+        if path is not None:
+            found += 1
+            lengths.append(stats['path_length'])
+
+    peak = None
+    if measure_memory:
+        fresh = MODES[mode](maze)
+        tracemalloc.start()
+        for start, goal in pairs:
+            fresh.solve(start, goal)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'mode': mode,
+        'queries': len(pairs),
+        'found': found,
+        'time': total_time,
+        'time_per_query': total_time / len(pairs),
+        'expanded': expanded,
+        'expansions_per_sec': expanded / total_time if total_time > 0 else None,
+        'pushes': pushes,
+        'stale_pops': stale,
+        'path_length_total': sum(lengths),
+        'peak_memory_bytes': peak,
+    }
+
+def run_suite(sizes, densities, seeds, modes, queries=5, repeat=1, measure_memory=True, log=None):
+    """
+    Chạy toàn bộ ma trận kích thước x mật độ x seed x chế độ.
+    Returns: Danh sách dict, mỗi dict là một dòng kết quả (kèm size, density, seed, map_time).
+    """
+    rows = []
+    for n in sizes:
+        for density in densities:
+            for seed in seeds:
+                t0 = time.perf_counter()
+                maze = GridMap(n)
+                maze.generate_random_map(density, seed=seed)
+                map_time = time.perf_counter() - t0
+                pairs = make_queries(maze, queries, seed)
+                for mode in modes:
+                    row = {'size': n, 'density': density, 'seed': seed, 'map_time': map_time}
+                    row.update(run_case(maze, mode, pairs, repeat, measure_memory))
+                    rows.append(row)
+                    if log:
+                        log(row)
+    return rows
+
+def environment_info():
+    """Thông tin môi trường chạy, ghi kèm kết quả để so sánh giữa các phiên bản."""
+    try:
+        # stdout=PIPE/universal_newlines thay cho capture_output/text (chỉ có từ Python 3.7)
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, universal_newlines=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'git_commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+def compare(current, baseline, threshold=0.10):
+    """
+    So sánh hai bộ kết quả theo (size, density, seed, mode).
+    Args:
+        current, baseline: Danh sách dòng kết quả (results trong file JSON).
+        threshold: Tỉ lệ chậm đi tối thiểu để coi là regression (0.10 = 10%).
+    Returns: Danh sách dict {key, time_ratio, expanded_ratio, regression}.
+    """
+    def key(row):
+        return (row['size'], row['density'], row['seed'], row['mode'])
+
+    base = {key(row): row for row in baseline}
+    report = []
+    for row in current:
+        old = base.get(key(row))
+        if old is None or not old['time']:
+            continue
+        time_ratio = row['time'] / old['time']
+        report.append({
+            'key': list(key(row)),
+            'time_ratio': time_ratio,
+            'expanded_ratio': row['expanded'] / old['expanded'] if old['expanded'] else None,
+            'path_length_changed': row['path_length_total'] != old['path_length_total'],
+            'regression': time_ratio > 1 + threshold,
+        })
+    return report
+
+def parse_list(text, cast):
+    return [cast(x) for x in text.split(',') if x]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark A* tren ban do ngau nhien co seed")
+    parser.add_argument('--sizes', default='50,200,500', help="Danh sach kich thuoc, vd 50,200,1000")
+    parser.add_argument('--densities', default='0.1,0.2,0.3')
+    parser.add_argument('--seeds', default='0,1,2')
+    parser.add_argument('--modes', default=','.join(MODES), help=f"Chon trong: {','.join(MODES)}")
+    parser.add_argument('--queries', type=int, default=5, help="So cap (start, goal) moi ban do")
+    parser.add_argument('--repeat', type=int, default=3, help="So lan lap moi truy van (lay min)")
+    parser.add_argument('--no-memory', action='store_true', help="Bo qua do bo nho dinh (tracemalloc)")
+    parser.add_argument('--output', help="File JSON ket qua (mac dinh in ra stdout)")
+    parser.add_argument('--compare', help="File JSON ket qua cu de so sanh")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Nguong regression thoi gian")
+    args = parser.parse_args(argv)
+
+    modes = parse_list(args.modes, str)
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"che do khong hop le: {unknown}")
+    config = {
+        'sizes': parse_list(args.sizes, int),
+        'densities': parse_list(args.densities, float),
+        'seeds': parse_list(args.seeds, int),
+        'modes': modes,
+        'queries': args.queries,
+        'repeat': args.repeat,
+    }
+
+    def log(row):
+        rate = row['expansions_per_sec']
+        print(f"n={row['size']:<5} d={row['density']:<4} seed={row['seed']:<3} {row['mode']:<14}"
+              f" {row['time_per_query'] * 1000:9.2f} ms/q  {rate or 0:12.0f} exp/s"
+              f"  pushes={row['pushes']:<9} peak={row['peak_memory_bytes'] or 0:>11}", file=sys.stderr)
+
+    rows = run_suite(config['sizes'], config['densities'], config['seeds'], modes,
+                     args.queries, args.repeat, not args.no_memory, log)
+    result = {'environment': environment_info(), 'config': config, 'results': rows}
+    regressions = []
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        result['comparison'] = compare(rows, baseline['results'], args.threshold)
+        regressions = [r for r in result['comparison'] if r['regression']]
+        print(f"So sanh voi {args.compare}: {len(regressions)} regression / {len(result['comparison'])} truong hop",
+              file=sys.stderr)
+        for r in regressions:
+            print(f"  REGRESSION {r['key']}: x{r['time_ratio']:.2f}", file=sys.stderr)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"Da ghi ket qua vao {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 1 if regressions else 0 # Mã thoát khác 0 khi có regression (dùng cho CI)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,385 @@
+import hashlib
 import heapq
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+
+def obstacle_array(maze_map):
+    """
+    Lấy mảng vật cản phẳng (1 chiều) của bản đồ, ô (r, c) ứng với chỉ số r * n + c.
+    Args:
+        maze_map: GridMap (có sẵn mảng obstacles) hoặc MazeMap (lưới Node).
+    Returns: np.ndarray uint8 kích thước n*n (1 = vật cản).
+    """
+    if hasattr(maze_map, 'obstacles'):
+        return maze_map.obstacles
+    n = maze_map.n
+    flat = np.zeros(n * n, dtype=np.uint8)
+    for r in range(n):
+        for c in range(n):
+            if maze_map.grid[r][c].is_obstacle:
+                flat[r * n + c] = 1
+    return flat
+
+def map_fingerprint(maze_map):
+    """
+    Mã băm nội dung bản đồ (kích thước + vật cản), dùng để kiểm tra dữ liệu tiền xử lý
+    còn khớp với bản đồ hay không.
+    Returns: Chuỗi hex SHA-1.
+    """
+    digest = hashlib.sha1(str(maze_map.n).encode())
+    digest.update(np.ascontiguousarray(obstacle_array(maze_map)).tobytes())
+    return digest.hexdigest()
+
+def bfs_distances(blocked, n, sources):
+    """
+    BFS theo từng lớp sóng (wavefront) được vector hóa bằng NumPy: mỗi lớp xử lý toàn bộ
+    frontier cùng lúc, chi phí tỉ lệ với số ô đến được.
+    Args:
+        blocked: Mảng vật cản phẳng (n*n).
+        n: Kích thước lưới.
+        sources: Danh sách chỉ số ô nguồn (khoảng cách 0).
+    Returns: np.ndarray int32 (n*n) - khoảng cách 4 hướng tới nguồn gần nhất, -1 nếu không tới được.
+    """
+    blocked = np.asarray(blocked)
+    dist = np.full(n * n, -1, dtype=np.int32)
+    frontier = np.asarray(sources, dtype=np.int64)
+    frontier = frontier[blocked[frontier] == 0]
+    dist[frontier] = 0
+    d = 0
+    while frontier.size:
+        d += 1
+        col = frontier % n
+        cand = np.concatenate((
+            frontier[frontier >= n] - n,          # Lên
+            frontier[frontier < n * n - n] + n,   # Xuống
+            frontier[col > 0] - 1,                # Trái
+            frontier[col < n - 1] + 1,            # Phải
+        ))
+        cand = cand[(dist[cand] == -1) & (blocked[cand] == 0)]
+        frontier = np.unique(cand)
+        dist[frontier] = d
+    return dist
+
+def label_components(blocked, n, mask=None):
+    """
+    Gán nhãn thành phần liên thông (4 hướng) cho các ô trống, vector hóa bằng NumPy:
+    union-find song song (móc gốc lớn vào gốc nhỏ + nhảy con trỏ) trên toàn bộ cạnh cùng lúc.
+    Args:
+        blocked: Mảng vật cản phẳng (n*n).
+        n: Kích thước lưới.
+        mask: Mảng bool (n*n) giới hạn các ô cần gán nhãn, mặc định mọi ô trống.
+    Returns: np.ndarray int32 (n*n) - nhãn 0..k-1, -1 với ô không thuộc mask.
+    """
+    size = n * n
+    free = (np.asarray(blocked) == 0) if mask is None else np.asarray(mask, dtype=bool)
+    parent = np.arange(size, dtype=np.int32)
+    not_last_col = (np.arange(size - 1) % n) != n - 1
+    h = np.flatnonzero(free[:-1] & free[1:] & not_last_col).astype(np.int32)
+    v = np.flatnonzero(free[:-n] & free[n:]).astype(np.int32)
+    u = np.concatenate((h, v))
+    w = np.concatenate((h + 1, v + n))
+    while True:
+        pu = parent[u]
+        pw = parent[w]
+        diff = pu != pw
+        if not diff.any():
+            break
+        # Sau bước nhảy con trỏ, pu/pw đều là gốc -> móc gốc lớn vào gốc nhỏ nhất kề nó
+        np.minimum.at(parent, np.maximum(pu[diff], pw[diff]), np.minimum(pu[diff], pw[diff]))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    labels = np.full(size, -1, dtype=np.int32)
+    _, compact = np.unique(parent[free], return_inverse=True)
+    labels[free] = compact
+    return labels
+
+class SearchState:
+    """
+    Trạng thái tìm kiếm riêng của một truy vấn (chế độ 'array').
+    Cấp phát một lần và dùng lại cho nhiều truy vấn: mỗi truy vấn tăng `generation`,
+    ô chỉ được coi là đã có g/parent (hoặc đã đóng) khi tem của nó bằng generation hiện tại,
+    nên không cần xóa mảng giữa các truy vấn.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.generation = 0
+        self.g = np.zeros(size, dtype=np.int32)
+        self.parent = np.zeros(size, dtype=np.int32)
+        self.seen = np.zeros(size, dtype=np.int32)    # Tem: g/parent hợp lệ
+        self.closed = np.zeros(size, dtype=np.int32)  # Tem: đã đóng (closed set)
+
+    def begin(self):
+        """
+        Bắt đầu truy vấn mới.
+        Returns: generation của truy vấn này.
+        """
+        self.generation += 1
+        if self.generation >= np.iinfo(np.int32).max:
+            # Tràn tem: xóa sạch một lần rồi đếm lại
+            self.seen[:] = 0
+            self.closed[:] = 0
+            self.generation = 1
+        return self.generation
+
+def _as_cell(pos, default):
+    """
+    Chuẩn hóa tọa độ ô về tuple (int, int).
+    Các bộ sinh map ngẫu nhiên trả về số nguyên numpy; để nguyên sẽ làm hỏng các phép tính
+    dấu kiểu (a > b) - (a < b) (numpy bool không trừ được).
+    Args:
+        pos: Tọa độ (x, y) bất kỳ kiểu số nguyên, hoặc None.
+        default: Tọa độ dùng khi pos là None (thường là map.start / map.goal).
+    Returns: Tuple (int, int).
+    """
+    if pos is None:
+        pos = default
+    return int(pos[0]), int(pos[1])
+
+def _alt_bound(alt, idx, h):
+    """
+    Cận dưới ALT: max_L |d(L, goal) - d(L, v)|, lấy max với h (Manhattan).
+    Args:
+        alt: Danh sách (bảng khoảng cách của landmark, d(L, goal)) từ LandmarkIndex.goal_terms.
+        idx: Chỉ số ô v.
+        h: Giá trị heuristic hiện có.
+    """
+    for table, dt in alt:
+        d = table[idx]
+        if d >= 0:
+            diff = dt - d if dt > d else d - dt
+            if diff > h:
+                h = diff
+    return h
+
+class BucketQueue:
+    """
+    Hàng đợi ưu tiên dạng bucket (Dial) cho khóa nguyên nhỏ, có decrease-key.
+    Với chi phí cạnh bằng 1, F và H là số nguyên nhỏ: phần tử được xếp vào bucket F, trong đó
+    chia tiếp theo H, nên thứ tự lấy ra giống heap (F trước, rồi H) mà không cần so sánh tuple.
+    Mỗi phần tử chỉ nằm trong hàng đợi một lần: push lại một phần tử đang có mặt sẽ chuyển nó
+    sang bucket mới (decrease-key) thay vì để lại bản ghi cũ, nên không bao giờ có stale pop.
+    Min F và min H (trong từng bucket F) là con trỏ chỉ tiến lên khi lấy ra, lùi lại khi push
+    khóa nhỏ hơn; với heuristic nhất quán, F lấy ra không giảm nên tổng số bước dò là nhỏ.
+    """
+    def __init__(self):
+        self._buckets = {}   # f -> {h -> {item: None}} (dict giữ thứ tự, xóa O(1))
+        self._min_h = {}     # f -> con trỏ min H của bucket f (có thể trỏ vào bucket đã rỗng)
+        self._key = {}       # item -> (f, h) hiện tại
+        self._min_f = 0
+        self.pushes = 0      # Số lần thêm phần tử mới
+        self.decreases = 0   # Số lần decrease-key (phần tử đã có, khóa tốt hơn)
+        self.pops = 0
+        self.stale_pops = 0  # Luôn bằng 0, giữ để so sánh cùng bộ đếm với heapq
+
+    def __len__(self):
+        return len(self._key)
+
+    def __contains__(self, item):
+        return item in self._key
+
+    def push(self, item, f, h):
+        """
+        Thêm phần tử, hoặc giảm khóa nếu phần tử đã có trong hàng đợi.
+        Args:
+            item: Phần tử (chỉ số ô hoặc tọa độ).
+            f, h: Khóa nguyên; thứ tự ưu tiên F trước, rồi H.
+        """
+        buckets = self._buckets
+        old = self._key.get(item)
+        if old is not None:
+            by_h = buckets[old[0]]
+            bucket = by_h[old[1]]
+            del bucket[item]
+            if not bucket:
+                del by_h[old[1]]
+                if not by_h:
+                    del buckets[old[0]]
+                    del self._min_h[old[0]]
+            self.decreases += 1
+        else:
+            if not self._key or f < self._min_f:
+                self._min_f = f
+            self.pushes += 1
+        self._key[item] = (f, h)
+        by_h = buckets.get(f)
+        if by_h is None:
+            buckets[f] = {h: {item: None}}
+            self._min_h[f] = h
+        else:
+            bucket = by_h.get(h)
+            if bucket is None:
+                by_h[h] = {item: None}
+                if h < self._min_h[f]:
+                    self._min_h[f] = h
+            else:
+                bucket[item] = None
+        if f < self._min_f:
+            self._min_f = f
+
+    def pop(self):
+        """
+        Lấy phần tử có (F, H) nhỏ nhất (cùng khóa: phần tử vào sau ra trước).
+        Returns: (f, h, item)
+        """
+        buckets = self._buckets
+        f = self._min_f
+        while f not in buckets:
+            f += 1
+        self._min_f = f
+        by_h = buckets[f]
+        h = self._min_h[f]
+        while h not in by_h:
+            h += 1
+        bucket = by_h[h]
+        item, _ = bucket.popitem()
+        if bucket:
+            self._min_h[f] = h
+        else:
+            del by_h[h]
+            if by_h:
+                self._min_h[f] = h + 1
+            else:
+                del buckets[f]
+                del self._min_h[f]
+        del self._key[item]
+        self.pops += 1
+        return f, h, item
+
+# Mức ghi vết quá trình tìm kiếm
+TRACE_OFF = 0       # Không ghi gì (mặc định, dùng khi chạy thật)
+TRACE_COUNTERS = 1  # Chỉ thống kê: số node duyệt, số lần push, thời gian
+TRACE_FULL = 2      # Thống kê + từng bước duyệt (visited_history / iter_solve)
+
+class SearchMetrics:
+    """
+    Bộ đếm và thời gian từng pha của một truy vấn (AStarSolver(..., profile=True)).
+    Counters:
+        expanded: số ô được mở rộng; pops / pushes: số lần lấy ra / đẩy vào heap;
+        stale_pops: bản ghi cũ bị bỏ qua; neighbor_checks: số ô lân cận (trong lưới) được xét;
+        closed_hits: ô lân cận đã đóng; blocked_hits: ô lân cận là vật cản;
+        improved: số lần g của một ô được cải thiện; max_open: kích thước lớn nhất của heap.
+    Phases (giây): setup (nạp vật cản, cấp phát trạng thái), search (vòng lặp chính),
+        reconstruct (dựng đường đi), total.
+    """
+    COUNTERS = ('expanded', 'pops', 'pushes', 'stale_pops', 'neighbor_checks',
+                'closed_hits', 'blocked_hits', 'improved', 'max_open')
+
+    def __init__(self, start, goal):
+        self.start = start
+        self.goal = goal
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.phases = {}
+        self.path_length = None
+        self.done = False
+
+    def to_dict(self):
+        """Returns: dict (giá trị JSON được) gồm start, goal, các counter, phases, path_length, done."""
+        data = {'start': list(self.start), 'goal': list(self.goal)}
+        data.update((name, getattr(self, name)) for name in self.COUNTERS)
+        data['phases'] = dict(self.phases)
+        data['path_length'] = self.path_length
+        data['done'] = self.done
+        return data
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+# Map dùng chung cho các tiến trình con của solve_many (nạp một lần qua initializer)
+_WORKER_SOLVER = None
+
+def _init_worker(solver):
+    global _WORKER_SOLVER
+    _WORKER_SOLVER = solver
+
+def _worker_query(pair):
+    return _WORKER_SOLVER.query(pair[0], pair[1])
 
 class AStarSolver:
     """
     Thực thi thuật toán tìm kiếm A*.
+    Hai chế độ:
+        - 'node':  Duyệt trên lưới Node của MazeMap (dễ quan sát, dùng cho lưới nhỏ).
+        - 'array': Duyệt trên chỉ số ô (int) với mảng g/parent phẳng, bộ nhớ cố định
+                   theo kích thước lưới, dùng cho lưới 10^6 - 10^7 ô (GridMap).
+    Mức trace (TRACE_OFF / TRACE_COUNTERS / TRACE_FULL) quyết định solve có trả về thống kê
+    và visited_history hay không; iter_solve luôn sinh từng bước duyệt một cách lười (lazy).
+    Map chỉ được đọc: trạng thái tìm kiếm nằm riêng trong từng truy vấn, nên một solver
+    có thể giải nhiều cặp (start, goal) liên tiếp hoặc song song trên nhiều luồng.
+    open_list='bucket' thay heapq bằng BucketQueue (decrease-key, không có bản ghi cũ);
+    so sánh qua stats['pushes'] và stats['stale_pops'].
+    weight > 1 cho weighted A* (cận sai số stats['bound'] = weight); solve_anytime / iter_anytime
+    chạy ARA*: có đường đi sớm rồi giảm dần epsilon đến khi hết thời gian.
+    profile=True ghi SearchMetrics (bộ đếm chi tiết, thời gian từng pha) vào self.metrics và gọi
+    on_metrics; khi tắt, vòng lặp tìm kiếm không có thêm lệnh nào.
     """
-    def __init__(self, maze_map):
+    def __init__(self, maze_map, mode=None, trace=TRACE_OFF, landmarks=None, components=None,
+                 open_list='heap', weight=1, profile=False, on_metrics=None, progress_every=None):
         self.map = maze_map
-        self.open_set = []
-        self.closed_set = set()
+        self.trace = trace
+        # LandmarkIndex: dùng heuristic ALT (bất đẳng thức tam giác) thay cho Manhattan thuần
+        self.landmarks = landmarks
+        # ComponentIndex: trả lời "không có đường" ngay khi Start và Goal khác thành phần liên thông
+        self.components = components
+        # Mặc định: GridMap -> 'array', MazeMap -> 'node'
+        if mode is None:
+            mode = 'array' if hasattr(maze_map, 'obstacles') else 'node'
+        if mode not in ('node', 'array'):
+            raise ValueError(f"Che do khong hop le: {mode}")
+        if mode == 'node' and not hasattr(maze_map, 'grid'):
+            raise ValueError("Che do 'node' can MazeMap (co luoi Node)")
+        self.mode = mode
+        # Open set: 'heap' (heapq, push lại khi có đường tốt hơn) hoặc 'bucket' (BucketQueue, decrease-key)
+        if open_list not in ('heap', 'bucket'):
+            raise ValueError(f"open_list khong hop le: {open_list}")
+        self.open_list = open_list
+        # Weighted A*: f = g + weight * h, đường đi trả về dài không quá weight lần tối ưu
+        if weight < 1:
+            raise ValueError(f"weight phai >= 1: {weight}")
+        if weight != 1 and open_list == 'bucket':
+            raise ValueError("open_list='bucket' can khoa nguyen, chi dung voi weight=1")
+        self.weight = 1 if weight == 1 else float(weight)
+        # Đo đạc chi tiết (SearchMetrics): chạy một bản vòng lặp riêng có đếm, bản thường không đổi
+        if profile and (mode != 'array' or open_list != 'heap'):
+            raise ValueError("profile chi ho tro che do 'array' voi open_list='heap'")
+        self.profile = profile
+        self.on_metrics = on_metrics         # Hàm nhận SearchMetrics khi truy vấn xong
+        self.progress_every = progress_every # Gọi on_metrics mỗi N lần mở rộng (metrics.done = False)
+        self.metrics = None                  # SearchMetrics của truy vấn gần nhất (khi profile=True)
+        self.stats = None     # Thống kê của lần solve gần nhất (None nếu TRACE_OFF)
+        self.last_path = None # Đường đi của lần solve gần nhất
+        self._local = threading.local()
+        self._blocked = None
+        self._blocked_version = None
+
+    def __getstate__(self):
+        # threading.local không pickle được -> bỏ qua khi gửi sang tiến trình khác
+        state = self.__dict__.copy()
+        state['_local'] = None
+        state['_blocked'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _refresh_obstacles(self):
+        """
+        Lấy lại mảng vật cản khi bản đồ đã thay đổi (theo map.version) kể từ lần tìm trước.
+        """
+        version = getattr(self.map, 'version', 0)
+        if self._blocked is None or self._blocked_version != version:
+            self._blocked = obstacle_array(self.map)
+            self._blocked_version = version
 
     def heuristic(self, node_a, pos_b):
         """
@@ -16,9 +388,17 @@ class AStarSolver:
         Args:
             node_a: Node hiện tại.
             pos_b: Tuple (x, y) của điểm đích.
-        Returns: Khoảng cách Manhattan giữa node_a và pos_b.
+        Returns: Khoảng cách Manhattan giữa node_a và pos_b
+            (hoặc cận dưới ALT nếu lớn hơn, khi solver có landmarks).
         """
-        return abs(node_a.x - pos_b[0]) + abs(node_a.y - pos_b[1])
+        return self._pos_heuristic((node_a.x, node_a.y), pos_b)
+
+    def _pos_heuristic(self, pos_a, pos_b):
+        """heuristic() trên tọa độ (dùng được cả với GridMap, không cần Node)."""
+        h = abs(pos_a[0] - pos_b[0]) + abs(pos_a[1] - pos_b[1])
+        if self.landmarks is not None:
+            h = max(h, self.landmarks.lower_bound(pos_a, pos_b))
+        return h
 
     def get_neighbors(self, node):
         """
@@ -29,7 +409,7 @@ class AStarSolver:
         """
         neighbors = []
         directions = [(-1, 0), (1, 0), (0, -1), (0, 1)] # Lên, Xuống, Trái, Phải
-        
+
         for dr, dc in directions:
             nr, nc = node.x + dr, node.y + dc
             if 0 <= nr < self.map.n and 0 <= nc < self.map.n:
@@ -38,64 +418,1975 @@ class AStarSolver:
                     neighbors.append(neighbor)
         return neighbors
 
-    def solve(self):
+    def solve(self, start=None, goal=None):
         """
         Chạy thuật toán.
+        Args:
+            start: Tuple (x, y) điểm bắt đầu, mặc định map.start.
+            goal: Tuple (x, y) điểm đích, mặc định map.goal.
         Returns: (path, visited_history)
             - path: Danh sách tọa độ từ Start đến Goal nếu tìm thấy, else None.
             - visited_history: Danh sách các bước đã thăm với thông tin g, h
+              (chỉ có khi trace=TRACE_FULL, ngược lại là list rỗng).
+        """
+        if self.trace == TRACE_FULL:
+            visited_history = list(self.iter_solve(start, goal))
+            return self.last_path, visited_history
+        start, goal = self._endpoints(start, goal)
+        path, self.stats = self._search(start, goal, self.trace)
+        self.last_path = path
+        return path, []
+
+    def iter_solve(self, start=None, goal=None):
+        """
+        Phiên bản generator của solve: sinh lần lượt từng sự kiện duyệt node
+        (dict 'pos', 'g', 'h', 'f') ngay khi node được lấy ra khỏi open set.
+        Khi generator kết thúc, đường đi nằm ở self.last_path và thống kê ở self.stats.
+        Args:
+            start: Tuple (x, y) điểm bắt đầu, mặc định map.start.
+            goal: Tuple (x, y) điểm đích, mặc định map.goal.
+        Returns (giá trị StopIteration): path hoặc None.
+        """
+        start, goal = self._endpoints(start, goal)
+        t0 = time.perf_counter()
+        if self._unreachable(start, goal):
+            path, expanded, pushes, stale = None, 0, 0, 0
+        else:
+            path, expanded, pushes, stale = yield from self._expand(start, goal, True)
+        self.last_path = path
+        self.stats = self._make_stats(start, goal, path, expanded, pushes, stale, t0)
+        return path
+
+    def query(self, start, goal):
+        """
+        Một truy vấn độc lập ở mức TRACE_COUNTERS (dùng cho chạy hàng loạt).
+        Args:
+            start: Tuple (x, y) điểm bắt đầu.
+            goal: Tuple (x, y) điểm đích.
+        Returns: (path, stats)
+            - stats: dict gồm start, goal, expanded, pushes, stale_pops, path_length, time.
+        """
+        return self._search(_as_cell(start, None), _as_cell(goal, None), TRACE_COUNTERS)
+
+    def solve_many(self, pairs, workers=None, executor='process', chunksize=16):
+        """
+        Giải nhiều cặp (start, goal) trên cùng một map (chỉ đọc).
+        Args:
+            pairs: Danh sách tuple (start, goal).
+            workers: Số worker, mặc định os.cpu_count(). workers=1 chạy tuần tự.
+            executor: 'process' (song song thật, map được nạp một lần mỗi tiến trình)
+                      hoặc 'thread' (dùng chung map trong bộ nhớ, hợp khi solver nhả GIL).
+            chunksize: Số truy vấn gửi cho tiến trình con mỗi lần (chỉ với 'process').
+        Returns: Danh sách (path, stats) theo đúng thứ tự của pairs.
+            Với ComponentIndex, các cặp khác thành phần liên thông được trả lời ngay (không gửi cho worker).
+        """
+        pairs = [(tuple(s), tuple(g)) for s, g in pairs]
+        results = [None] * len(pairs)
+        todo = []
+        for i, (s, g) in enumerate(pairs):
+            if self._unreachable(s, g):
+                results[i] = self.query(s, g)
+            else:
+                todo.append(i)
+
+        workers = workers or os.cpu_count() or 1
+        todo_pairs = [pairs[i] for i in todo]
+        if workers == 1 or len(todo_pairs) <= 1:
+            solved = [self.query(s, g) for s, g in todo_pairs]
+        elif executor == 'thread':
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                solved = list(pool.map(lambda pair: self.query(pair[0], pair[1]), todo_pairs))
+        elif executor == 'process':
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self,)) as pool:
+                solved = list(pool.map(_worker_query, todo_pairs, chunksize=chunksize))
+        else:
+            raise ValueError(f"executor khong hop le: {executor}")
+
+        for i, result in zip(todo, solved):
+            results[i] = result
+        return results
+
+    def solve_anytime(self, start=None, goal=None, epsilon=3.0, step=0.5, time_limit=1.0):
+        """
+        Chạy ARA* đến khi đạt đường tối ưu (bound = 1) hoặc hết time_limit giây.
+        Args:
+            start, goal: Tuple (x, y), mặc định map.start / map.goal.
+            epsilon: Trọng số heuristic ban đầu (lần tìm đầu tiên nhanh nhất).
+            step: Mức giảm epsilon sau mỗi lần có đường đi.
+            time_limit: Thời gian tối đa (giây), None để chạy đến khi tối ưu.
+        Returns: (path, bound, solutions)
+            - path: Đường đi tốt nhất tìm được trước hạn, else None.
+            - bound: Cận sai số đảm bảo của path (độ dài <= bound * tối ưu).
+            - solutions: Danh sách mọi kết quả trung gian (xem iter_anytime).
+        """
+        solutions = list(self.iter_anytime(start, goal, epsilon, step, time_limit))
+        if not solutions:
+            return None, None, solutions
+        return solutions[-1]['path'], solutions[-1]['bound'], solutions
+
+    def iter_anytime(self, start=None, goal=None, epsilon=3.0, step=0.5, time_limit=None):
         """
-        start_node = self.map.grid[self.map.start[0]][self.map.start[1]]
-        goal_pos = self.map.goal
-        
-        start_node.g = 0
-        start_node.h = self.heuristic(start_node, goal_pos)
-        start_node.f = start_node.h
-        
-        heapq.heappush(self.open_set, start_node)
-        
-        visited_history = [] 
-
-        while self.open_set:
-            current = heapq.heappop(self.open_set)
-            
-            step_info = {
-                'pos': current.get_pos(),
-                'g': current.g,
-                'h': current.h,
-                'f': current.f
-            }
-            visited_history.append(step_info)
-
-            if current.get_pos() == goal_pos:
-                return self._reconstruct_path(current), visited_history
-
-            self.closed_set.add(current.get_pos())
-
-            for neighbor in self.get_neighbors(current):
-                if neighbor.get_pos() in self.closed_set:
+        Anytime Repairing A* (ARA*): tìm đường với f = g + epsilon * h, sau đó giảm epsilon và
+        sửa lại đường đi, dùng lại g/parent của các lần trước. Chỉ các ô có g được cải thiện sau khi
+        đã đóng (danh sách INCONS) mới được đưa trở lại open set, nên mỗi lần lặp rẻ hơn tìm lại từ đầu.
+        Args:
+            start, goal: Tuple (x, y), mặc định map.start / map.goal.
+            epsilon: Trọng số heuristic ban đầu (>= 1).
+            step: Mức giảm epsilon sau mỗi lần có đường đi.
+            time_limit: Thời gian tối đa (giây) tính từ lúc bắt đầu, None để chạy đến khi tối ưu.
+        Yields: dict mỗi khi đường đi hoặc cận sai số tốt lên
+            - 'path', 'path_length', 'epsilon' (trọng số đang dùng),
+            - 'bound': cận sai số đảm bảo min(epsilon, g(goal) / min(g + h) trên OPEN và INCONS)
+              (None nếu hết giờ trước khi lần tìm đầu tiên hoàn tất),
+            - 'expanded' (cộng dồn), 'time' (giây kể từ lúc bắt đầu).
+        Khi kết thúc, đường đi tốt nhất nằm ở self.last_path và thống kê ở self.stats.
+        """
+        if epsilon < 1:
+            raise ValueError(f"epsilon phai >= 1: {epsilon}")
+        start, goal = self._endpoints(start, goal)
+        t0 = time.perf_counter()
+        deadline = None if time_limit is None else t0 + time_limit
+        self.last_path = None
+        if self._unreachable(start, goal):
+            self.stats = self._make_stats(start, goal, None, 0, 0, 0, t0)
+            return
+
+        self._refresh_obstacles()
+        blocked = memoryview(self._blocked)
+        n = self.map.n
+        h_cache = {}
+
+        def h(pos):
+            value = h_cache.get(pos)
+            if value is None:
+                value = h_cache[pos] = self._pos_heuristic(pos, goal)
+            return value
+
+        eps = float(epsilon)
+        g = {start: 0}
+        parent = {start: None}
+        open_set = [(eps * h(start), h(start), start)]
+        closed = set()
+        incons = set()
+        inf = float('inf')
+        expanded = 0
+        pushes = 1
+        stale = 0
+        best_g = inf
+        bound = None
+
+        while True:
+            # ImprovePath: A* có trọng số, dừng khi g(goal) <= khóa nhỏ nhất của OPEN
+            timed_out = False
+            g_goal = g.get(goal, inf)
+            while open_set:
+                key, hv, pos = open_set[0]
+                if pos in closed:
+                    heapq.heappop(open_set)
+                    stale += 1
                     continue
+                if g_goal <= key:
+                    break
+                if deadline is not None and not expanded & 255 and time.perf_counter() > deadline:
+                    timed_out = True
+                    break
+                heapq.heappop(open_set)
+                closed.add(pos)
+                expanded += 1
+
+                r, c = pos
+                ng = g[pos] + 1
+                for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                    if nr < 0 or nr >= n or nc < 0 or nc >= n or blocked[nr * n + nc]:
+                        continue
+                    nb = (nr, nc)
+                    if ng < g.get(nb, inf):
+                        g[nb] = ng
+                        parent[nb] = pos
+                        if nb == goal:
+                            g_goal = ng
+                        if nb in closed:
+                            incons.add(nb) # Đã đóng trong lần lặp này: chờ lần lặp sau
+                        else:
+                            nh = h(nb)
+                            heapq.heappush(open_set, (ng + eps * nh, nh, nb))
+                            pushes += 1
+
+            improved = g_goal < best_g
+            if improved:
+                best_g = g_goal
+                self.last_path = self._reconstruct_path(parent, goal)
+            if self.last_path is not None:
+                # Ô trung gian có thể đã được cải thiện sau khi gán g(goal): đường theo parent có thể ngắn hơn
+                length = len(self.last_path) - 1
+                new_bound = bound # Hết giờ giữa chừng: đường mới không dài hơn đường cũ nên vẫn thỏa cận cũ
+                if not timed_out:
+                    # ImprovePath hoàn tất: đường đi trong epsilon lần tối ưu; cận dưới của chi phí tối ưu
+                    # là min g + h trên các ô còn chờ mở rộng (OPEN và INCONS)
+                    frontier = [g[p] + h(p) for _, _, p in open_set if p not in closed]
+                    frontier.extend(g[p] + h(p) for p in incons)
+                    lower = min(frontier) if frontier else length
+                    new_bound = min(eps, length / lower) if lower > 0 else 1.0
+                    new_bound = max(1.0, new_bound if bound is None else min(bound, new_bound))
+                improved = improved or (new_bound is not None and (bound is None or new_bound < bound))
+                bound = new_bound
+            if improved:
+                yield {
+                    'path': self.last_path,
+                    'path_length': length,
+                    'epsilon': eps,
+                    'bound': bound,
+                    'expanded': expanded,
+                    'time': time.perf_counter() - t0,
+                }
+
+            if best_g == inf and not timed_out:
+                break # Hết open set mà không chạm tới Goal: không có đường
+            if timed_out or bound == 1.0 or eps == 1.0:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+            # Giảm epsilon, gộp INCONS vào OPEN với khóa mới, làm rỗng CLOSED
+            eps = max(1.0, eps - step)
+            pending = {p for _, _, p in open_set if p not in closed} | incons
+            open_set = [(g[p] + eps * h(p), h(p), p) for p in pending]
+            heapq.heapify(open_set)
+            closed = set()
+            incons = set()
+
+        self.stats = self._make_stats(start, goal, self.last_path, expanded, pushes, stale, t0)
+        self.stats['bound'] = bound
+
+    def _unreachable(self, start, goal):
+        """True nếu ComponentIndex khẳng định không có đường (khác thành phần liên thông)."""
+        return self.components is not None and not self.components.connected(start, goal)
+
+    def _endpoints(self, start, goal):
+        return _as_cell(start, self.map.start), _as_cell(goal, self.map.goal)
+
+    def _make_stats(self, start, goal, path, expanded, pushes, stale, t0):
+        return {
+            'start': start,
+            'goal': goal,
+            'expanded': expanded,
+            'pushes': pushes,
+            'stale_pops': stale, # Bản ghi cũ lấy ra khỏi open set rồi bỏ qua
+            'bound': self.weight,  # path_length <= bound * tối ưu
+            'path_length': len(path) - 1 if path else None,
+            'time': time.perf_counter() - t0,
+        }
+
+    def _expand(self, start, goal, emit):
+        if self.mode == 'array':
+            if self.open_list == 'bucket':
+                return self._expand_array_bucket(start, goal, emit)
+            if self.profile:
+                return self._expand_array_profiled(start, goal, emit)
+            return self._expand_array(start, goal, emit)
+        return self._expand_node(start, goal, emit)
+
+    def _search(self, start, goal, trace):
+        """
+        Chạy một truy vấn không sinh sự kiện: generator tìm kiếm chạy một mạch
+        đến khi kết thúc, không cấp phát gì thêm cho mỗi bước duyệt.
+        Args:
+            start, goal: Tuple (x, y).
+            trace: TRACE_OFF (không thống kê) hoặc TRACE_COUNTERS.
+        Returns: (path, stats) - stats là None khi TRACE_OFF.
+        """
+        t0 = time.perf_counter() if trace else None
+        if self._unreachable(start, goal):
+            path, expanded, pushes, stale = None, 0, 0, 0
+        else:
+            try:
+                next(self._expand(start, goal, False))
+            except StopIteration as stop:
+                path, expanded, pushes, stale = stop.value
+        if not trace:
+            return path, None
+        return path, self._make_stats(start, goal, path, expanded, pushes, stale, t0)
+
+    def _expand_node(self, start, goal_pos, emit):
+        """
+        A* trên lưới Node (generator). g, parent, closed set là dict/set cục bộ của truy vấn,
+        không ghi lên Node dùng chung của MazeMap.
+        Args:
+            emit: True để yield sự kiện mỗi khi duyệt một node.
+        Returns (giá trị StopIteration): (path, expanded, pushes, stale_pops)
+        """
+        grid = self.map.grid
+        start_node = grid[start[0]][start[1]]
+        h0 = self.heuristic(start_node, goal_pos)
+
+        g_score = {start: 0}
+        parent = {start: None}
+        closed_set = set()
+        # Phần tử heap: (f, h, pos) - so sánh F trước, rồi H, giống Node.__lt__
+        bucket = self.open_list == 'bucket'
+        if bucket:
+            open_set = BucketQueue()
+            open_set.push(start, h0, h0)
+        else:
+            open_set = [(self.weight * h0, h0, start)]
+        expanded = 0
+        pushes = 1
+        stale = 0
 
-                tentative_g = current.g + 1
+        while open_set:
+            if bucket:
+                f, h, pos = open_set.pop()
+            else:
+                f, h, pos = heapq.heappop(open_set)
+                if pos in closed_set:
+                    stale += 1
+                    continue # Bản ghi cũ (đã có đường tốt hơn)
+            expanded += 1
 
-                if tentative_g < neighbor.g:
-                    neighbor.parent = current
-                    neighbor.g = tentative_g
-                    neighbor.h = self.heuristic(neighbor, goal_pos)
-                    neighbor.f = neighbor.g + neighbor.h
-                    heapq.heappush(self.open_set, neighbor)
-        
-        return None, visited_history
+            if emit:
+                yield {
+                    'pos': pos,
+                    'g': g_score[pos],
+                    'h': h,
+                    'f': f
+                }
 
-    def _reconstruct_path(self, node):
+            if pos == goal_pos:
+                return self._reconstruct_path(parent, pos), expanded, pushes, stale
+
+            closed_set.add(pos)
+            tentative_g = g_score[pos] + 1
+
+            for neighbor in self.get_neighbors(grid[pos[0]][pos[1]]):
+                nb_pos = neighbor.get_pos()
+                if nb_pos in closed_set:
+                    continue
+
+                if tentative_g < g_score.get(nb_pos, float('inf')):
+                    parent[nb_pos] = pos
+                    g_score[nb_pos] = tentative_g
+                    nh = self.heuristic(neighbor, goal_pos)
+                    if bucket:
+                        open_set.push(nb_pos, tentative_g + nh, nh)
+                    else:
+                        heapq.heappush(open_set, (tentative_g + self.weight * nh, nh, nb_pos))
+                    pushes += 1
+
+        return None, expanded, pushes, stale
+
+    def _get_state(self, slot='state'):
+        """
+        Lấy SearchState riêng của luồng hiện tại (tạo khi cần).
+        Args:
+            slot: Tên trạng thái, cho phép một luồng giữ nhiều trạng thái (ví dụ tìm kiếm hai chiều).
+        """
+        state = getattr(self._local, slot, None)
+        if state is None:
+            state = SearchState(self.map.n * self.map.n)
+            setattr(self._local, slot, state)
+        return state
+
+    def _expand_array(self, start_pos, goal_pos, emit):
+        """
+        A* trên chỉ số ô (generator): open set chứa tuple (f, h, idx), giữ thứ tự ưu tiên F rồi H
+        như Node.__lt__. g, parent, closed nằm trong SearchState của luồng, dùng lại giữa các truy vấn.
+        Args:
+            emit: True để yield sự kiện mỗi khi duyệt một ô.
+        Returns (giá trị StopIteration): (path, expanded, pushes, stale_pops)
+        """
+        n = self.map.n
+        gr, gc = goal_pos
+        start = start_pos[0] * n + start_pos[1]
+        goal = gr * n + gc
+
+        self._refresh_obstacles()
+        state = self._get_state()
+        gen = state.begin()
+
+        # Truy cập từng phần tử qua memoryview nhanh hơn nhiều so với chỉ số NumPy
+        blocked = memoryview(self._blocked)
+        g = memoryview(state.g)
+        parent = memoryview(state.parent)
+        seen = memoryview(state.seen)
+        closed = memoryview(state.closed)
+
+        h0 = abs(start_pos[0] - gr) + abs(start_pos[1] - gc)
+        # ALT: khoảng cách từ mỗi landmark tới Goal, tính một lần cho cả truy vấn
+        alt = self.landmarks.goal_terms(goal) if self.landmarks is not None else None
+        if alt:
+            h0 = _alt_bound(alt, start, h0)
+        g[start] = 0
+        parent[start] = -1
+        seen[start] = gen
+        weight = self.weight
+        open_set = [(weight * h0, h0, start)]
+        expanded = 0
+        pushes = 1
+        stale = 0
+
+        while open_set:
+            f, h, current = heapq.heappop(open_set)
+            if closed[current] == gen:
+                stale += 1
+                continue # Bản ghi cũ (đã có đường tốt hơn)
+            expanded += 1
+
+            r, c = divmod(current, n)
+            cur_g = g[current]
+            if emit:
+                yield {'pos': (r, c), 'g': cur_g, 'h': h, 'f': f}
+
+            if current == goal:
+                return self._reconstruct_index_path(parent, goal), expanded, pushes, stale
+
+            closed[current] = gen
+            tentative_g = cur_g + 1
+
+            # Lên, Xuống, Trái, Phải
+            for nb, nr, nc in ((current - n, r - 1, c), (current + n, r + 1, c),
+                               (current - 1, r, c - 1), (current + 1, r, c + 1)):
+                if nr < 0 or nr >= n or nc < 0 or nc >= n:
+                    continue
+                if blocked[nb] or closed[nb] == gen:
+                    continue
+                if seen[nb] != gen or tentative_g < g[nb]:
+                    seen[nb] = gen
+                    g[nb] = tentative_g
+                    parent[nb] = current
+                    nh = abs(nr - gr) + abs(nc - gc)
+                    if alt:
+                        nh = _alt_bound(alt, nb, nh)
+                    heapq.heappush(open_set, (tentative_g + weight * nh, nh, nb))
+                    pushes += 1
+
+        return None, expanded, pushes, stale
+
+    def _expand_array_profiled(self, start_pos, goal_pos, emit):
+        """
+        Như _expand_array nhưng đếm mọi thao tác và đo thời gian từng pha vào SearchMetrics.
+        Tách thành bản riêng để bản thường không phải trả chi phí kiểm tra/đếm trong vòng lặp.
+        Returns (giá trị StopIteration): (path, expanded, pushes, stale_pops)
+        """
+        clock = time.perf_counter
+        t0 = clock()
+        m = SearchMetrics(start_pos, goal_pos)
+        self.metrics = m
+        hook = self.on_metrics
+        every = self.progress_every if hook is not None else None
+
+        n = self.map.n
+        gr, gc = goal_pos
+        start = start_pos[0] * n + start_pos[1]
+        goal = gr * n + gc
+
+        self._refresh_obstacles()
+        state = self._get_state()
+        gen = state.begin()
+        blocked = memoryview(self._blocked)
+        g = memoryview(state.g)
+        parent = memoryview(state.parent)
+        seen = memoryview(state.seen)
+        closed = memoryview(state.closed)
+
+        h0 = abs(start_pos[0] - gr) + abs(start_pos[1] - gc)
+        alt = self.landmarks.goal_terms(goal) if self.landmarks is not None else None
+        if alt:
+            h0 = _alt_bound(alt, start, h0)
+        g[start] = 0
+        parent[start] = -1
+        seen[start] = gen
+        weight = self.weight
+        open_set = [(weight * h0, h0, start)]
+        expanded = pops = stale = checks = closed_hits = blocked_hits = improved = 0
+        pushes = max_open = 1
+        found = False
+        t1 = clock()
+        m.phases['setup'] = t1 - t0
+
+        def sync():
+            m.expanded, m.pops, m.pushes, m.stale_pops = expanded, pops, pushes, stale
+            m.neighbor_checks, m.closed_hits, m.blocked_hits = checks, closed_hits, blocked_hits
+            m.improved, m.max_open = improved, max_open
+
+        while open_set:
+            f, h, current = heapq.heappop(open_set)
+            pops += 1
+            if closed[current] == gen:
+                stale += 1
+                continue
+            expanded += 1
+            if every and expanded % every == 0:
+                sync()
+                m.phases['search'] = clock() - t1
+                hook(m)
+
+            r, c = divmod(current, n)
+            cur_g = g[current]
+            if emit:
+                yield {'pos': (r, c), 'g': cur_g, 'h': h, 'f': f}
+
+            if current == goal:
+                found = True
+                break
+
+            closed[current] = gen
+            tentative_g = cur_g + 1
+            for nb, nr, nc in ((current - n, r - 1, c), (current + n, r + 1, c),
+                               (current - 1, r, c - 1), (current + 1, r, c + 1)):
+                if nr < 0 or nr >= n or nc < 0 or nc >= n:
+                    continue
+                checks += 1
+                if blocked[nb]:
+                    blocked_hits += 1
+                    continue
+                if closed[nb] == gen:
+                    closed_hits += 1
+                    continue
+                if seen[nb] != gen or tentative_g < g[nb]:
+                    if seen[nb] == gen:
+                        improved += 1
+                    seen[nb] = gen
+                    g[nb] = tentative_g
+                    parent[nb] = current
+                    nh = abs(nr - gr) + abs(nc - gc)
+                    if alt:
+                        nh = _alt_bound(alt, nb, nh)
+                    heapq.heappush(open_set, (tentative_g + weight * nh, nh, nb))
+                    pushes += 1
+                    if len(open_set) > max_open:
+                        max_open = len(open_set)
+
+        t2 = clock()
+        m.phases['search'] = t2 - t1
+        path = self._reconstruct_index_path(parent, goal) if found else None
+        t3 = clock()
+        sync()
+        m.phases['reconstruct'] = t3 - t2
+        m.phases['total'] = t3 - t0
+        m.path_length = len(path) - 1 if path else None
+        m.done = True
+        if hook is not None:
+            hook(m)
+        return path, expanded, pushes, stale
+
+    def _expand_array_bucket(self, start_pos, goal_pos, emit):
+        """
+        Như _expand_array nhưng open set là BucketQueue: ô đã có trong open set được giảm khóa
+        tại chỗ thay vì đẩy thêm bản ghi, nên không có stale pop và không cần so sánh tuple.
+        Returns (giá trị StopIteration): (path, expanded, pushes, stale_pops)
+            - pushes: tổng số lần thêm mới và decrease-key.
+        """
+        n = self.map.n
+        gr, gc = goal_pos
+        start = start_pos[0] * n + start_pos[1]
+        goal = gr * n + gc
+
+        self._refresh_obstacles()
+        state = self._get_state()
+        gen = state.begin()
+
+        blocked = memoryview(self._blocked)
+        g = memoryview(state.g)
+        parent = memoryview(state.parent)
+        seen = memoryview(state.seen)
+        closed = memoryview(state.closed)
+
+        h0 = abs(start_pos[0] - gr) + abs(start_pos[1] - gc)
+        alt = self.landmarks.goal_terms(goal) if self.landmarks is not None else None
+        if alt:
+            h0 = _alt_bound(alt, start, h0)
+        g[start] = 0
+        parent[start] = -1
+        seen[start] = gen
+        open_set = BucketQueue()
+        push = open_set.push
+        pop = open_set.pop
+        push(start, h0, h0)
+        expanded = 0
+
+        while open_set:
+            f, h, current = pop()
+            expanded += 1
+
+            r, c = divmod(current, n)
+            cur_g = g[current]
+            if emit:
+                yield {'pos': (r, c), 'g': cur_g, 'h': h, 'f': f}
+
+            if current == goal:
+                path = self._reconstruct_index_path(parent, goal)
+                return path, expanded, open_set.pushes + open_set.decreases, 0
+
+            closed[current] = gen
+            tentative_g = cur_g + 1
+
+            for nb, nr, nc in ((current - n, r - 1, c), (current + n, r + 1, c),
+                               (current - 1, r, c - 1), (current + 1, r, c + 1)):
+                if nr < 0 or nr >= n or nc < 0 or nc >= n:
+                    continue
+                if blocked[nb] or closed[nb] == gen:
+                    continue
+                if seen[nb] != gen or tentative_g < g[nb]:
+                    seen[nb] = gen
+                    g[nb] = tentative_g
+                    parent[nb] = current
+                    nh = abs(nr - gr) + abs(nc - gc)
+                    if alt:
+                        nh = _alt_bound(alt, nb, nh)
+                    push(nb, tentative_g + nh, nh)
+
+        return None, expanded, open_set.pushes + open_set.decreases, 0
+
+    def _reconstruct_index_path(self, parent, goal_idx):
+        """
+        Tái tạo đường đi từ mảng parent (chế độ 'array').
+        Args:
+            parent: Mảng (memoryview) chỉ số ô cha.
+            goal_idx: Chỉ số ô đích.
+        Returns: Danh sách tọa độ từ Start đến Goal.
+        """
+        n = self.map.n
+        path = []
+        idx = goal_idx
+        while idx != -1:
+            path.append(divmod(idx, n))
+            idx = parent[idx]
+        return path[::-1]
+
+    def _reconstruct_path(self, parent, pos):
         '''
         Tái tạo đường đi từ Start đến Goal.
         Args:
-            node: Node đích (Goal).
+            parent: Dict pos -> pos cha của truy vấn.
+            pos: Tọa độ đích (Goal).
         Returns: Danh sách tọa độ từ Start đến Goal.
         '''
         path = []
-        while node:
-            path.append(node.get_pos())
-            node = node.parent
-        return path[::-1]
\ No newline at end of file
+        while pos is not None:
+            path.append(pos)
+            pos = parent[pos]
+        return path[::-1]
+
+class JPSSolver(AStarSolver):
+    """
+    Jump Point Search cho lưới 4 hướng, chi phí mỗi bước bằng 1.
+    Thay vì đẩy từng ô lân cận vào heap, thuật toán "nhảy" thẳng theo một hướng đến khi gặp
+    ô có hàng xóm bắt buộc (forced neighbor) hoặc Goal, nên bỏ qua các đường đi đối xứng
+    mà A* thường phải duyệt. Đường đi trả về vẫn tối ưu và cùng định dạng với AStarSolver.
+    Dùng chung giao diện solve / iter_solve / query / solve_many của AStarSolver.
+    """
+    def __init__(self, maze_map, trace=TRACE_OFF):
+        super().__init__(maze_map, mode='array', trace=trace)
+
+    def _expand(self, start_pos, goal_pos, emit):
+        """
+        JPS (generator). Các sự kiện chỉ ứng với jump point được lấy ra khỏi open set.
+        Returns (giá trị StopIteration): (path, expanded, pushes, stale_pops)
+        """
+        n = self.map.n
+        self._refresh_obstacles()
+        blocked = memoryview(self._blocked)
+        gr, gc = goal_pos
+
+        def free(r, c):
+            return 0 <= r < n and 0 <= c < n and not blocked[r * n + c]
+
+        def jump_h(r, c, dc):
+            # Nhảy ngang: dừng khi ô phía trên/dưới mở ra mà ô chéo phía sau bị chặn
+            while True:
+                c += dc
+                if not free(r, c):
+                    return None
+                if r == gr and c == gc:
+                    return (r, c)
+                if (free(r - 1, c) and not free(r - 1, c - dc)) or \
+                   (free(r + 1, c) and not free(r + 1, c - dc)):
+                    return (r, c)
+
+        def jump_v(r, c, dr):
+            # Nhảy dọc: ngoài forced neighbor, dừng cả khi một lần nhảy ngang từ ô này tìm được jump point
+            while True:
+                r += dr
+                if not free(r, c):
+                    return None
+                if r == gr and c == gc:
+                    return (r, c)
+                if (free(r, c - 1) and not free(r - dr, c - 1)) or \
+                   (free(r, c + 1) and not free(r - dr, c + 1)):
+                    return (r, c)
+                if jump_h(r, c, 1) is not None or jump_h(r, c, -1) is not None:
+                    return (r, c)
+
+        h0 = abs(start_pos[0] - gr) + abs(start_pos[1] - gc)
+        g_score = {start_pos: 0}
+        parent = {start_pos: None}
+        closed_set = set()
+        open_set = [(h0, h0, start_pos)]
+        expanded = 0
+        pushes = 1
+        stale = 0
+
+        while open_set:
+            f, h, pos = heapq.heappop(open_set)
+            if pos in closed_set:
+                stale += 1
+                continue
+            expanded += 1
+            cur_g = g_score[pos]
+
+            if emit:
+                yield {'pos': pos, 'g': cur_g, 'h': h, 'f': f}
+
+            if pos == goal_pos:
+                return self._expand_jump_path(self._reconstruct_path(parent, pos)), expanded, pushes, stale
+
+            closed_set.add(pos)
+            r, c = pos
+            prev = parent[pos]
+
+            # Cắt tỉa theo hướng đi từ jump point cha (các jump point luôn thẳng hàng với cha)
+            if prev is None:
+                successors = (jump_v(r, c, -1), jump_v(r, c, 1), jump_h(r, c, -1), jump_h(r, c, 1))
+            elif prev[0] == r:
+                dc = 1 if c > prev[1] else -1
+                successors = (jump_h(r, c, dc), jump_v(r, c, -1), jump_v(r, c, 1))
+            else:
+                dr = 1 if r > prev[0] else -1
+                successors = (jump_v(r, c, dr), jump_h(r, c, -1), jump_h(r, c, 1))
+
+            for jp in successors:
+                if jp is None or jp in closed_set:
+                    continue
+                tentative_g = cur_g + abs(jp[0] - r) + abs(jp[1] - c)
+                if tentative_g < g_score.get(jp, float('inf')):
+                    g_score[jp] = tentative_g
+                    parent[jp] = pos
+                    nh = abs(jp[0] - gr) + abs(jp[1] - gc)
+                    heapq.heappush(open_set, (tentative_g + nh, nh, jp))
+                    pushes += 1
+
+        return None, expanded, pushes, stale
+
+    def _expand_jump_path(self, jump_points):
+        """
+        Nối các jump point (thẳng hàng từng đôi một) thành đường đi đầy đủ từng ô.
+        Args:
+            jump_points: Danh sách tọa độ jump point từ Start đến Goal.
+        Returns: Danh sách tọa độ từng ô từ Start đến Goal.
+        """
+        path = [jump_points[0]]
+        for (r1, c1), (r2, c2) in zip(jump_points, jump_points[1:]):
+            dr = (r2 > r1) - (r2 < r1)
+            dc = (c2 > c1) - (c2 < c1)
+            r, c = r1, c1
+            while (r, c) != (r2, c2):
+                r += dr
+                c += dc
+                path.append((r, c))
+        return path
+
+class BidirectionalAStarSolver(AStarSolver):
+    """
+    A* hai chiều: tìm đồng thời từ Start và từ Goal, mỗi lần mở rộng phía có open set nhỏ hơn.
+    Hai phía dùng heuristic trung bình p(v) = (h_goal(v) - h_start(v)) / 2 (phía ngược dùng -p),
+    nên khóa của hai heap "cộng" được với nhau.
+    Điều kiện dừng (gặp nhau ở giữa): gọi mu là chi phí đường đi tốt nhất đã nối được qua một ô
+    mà cả hai phía cùng chạm tới. Dừng khi min khóa xuôi + min khóa ngược >= mu: mọi đường đi chưa
+    tìm thấy đều phải đi qua cả hai open set nên có chi phí >= tổng đó, do đó mu là tối ưu.
+    Đường đi trả về cùng định dạng với _reconstruct_path.
+    """
+    def __init__(self, maze_map, trace=TRACE_OFF):
+        super().__init__(maze_map, mode='array', trace=trace)
+
+    def compare_with_unidirectional(self, start=None, goal=None):
+        """
+        So sánh số node phải duyệt với AStarSolver một chiều trên cùng map.
+        Args:
+            start, goal: Tuple (x, y), mặc định map.start / map.goal.
+        Returns: dict gồm expanded của hai cách, số node tiết kiệm được (saved) và độ dài đường đi.
+        """
+        start, goal = self._endpoints(start, goal)
+        path, bi_stats = self._search(start, goal, TRACE_COUNTERS)
+        uni_path, uni_stats = AStarSolver(self.map, mode='array').query(start, goal)
+        return {
+            'bidirectional_expanded': bi_stats['expanded'],
+            'unidirectional_expanded': uni_stats['expanded'],
+            'saved': uni_stats['expanded'] - bi_stats['expanded'],
+            'path_length': bi_stats['path_length'],
+            'unidirectional_path_length': uni_stats['path_length'],
+        }
+
+    def _expand(self, start_pos, goal_pos, emit):
+        """
+        A* hai chiều (generator). Sự kiện có thêm khóa 'direction' ('forward' / 'backward').
+        Returns (giá trị StopIteration): (path, expanded, pushes, stale_pops)
+        """
+        n = self.map.n
+        self._refresh_obstacles()
+        blocked = memoryview(self._blocked)
+        start = start_pos[0] * n + start_pos[1]
+        goal = goal_pos[0] * n + goal_pos[1]
+
+        # Chỉ số 0: chiều xuôi (từ Start), 1: chiều ngược (từ Goal)
+        states = (self._get_state('state'), self._get_state('state_back'))
+        gens = (states[0].begin(), states[1].begin())
+        gs = [memoryview(st.g) for st in states]
+        parents = [memoryview(st.parent) for st in states]
+        seens = [memoryview(st.seen) for st in states]
+        closeds = [memoryview(st.closed) for st in states]
+        targets = (goal_pos, start_pos)
+        names = ('forward', 'backward')
+
+        sr, sc = start_pos
+        gr, gc = goal_pos
+        h0 = abs(sr - gr) + abs(sc - gc)
+        # Khóa (nhân 2 để giữ số nguyên): 2g + h_goal - h_start cho chiều xuôi, ngược lại cho chiều ngược
+        opens = ([(0, h0, start)], [(0, h0, goal)])
+        for d, origin in ((0, start), (1, goal)):
+            gs[d][origin] = 0
+            parents[d][origin] = -1
+            seens[d][origin] = gens[d]
+
+        mu = 0 if start == goal else float('inf')
+        meet = start if start == goal else -1
+        expanded = 0
+        pushes = 2
+        stale = 0
+
+        while True:
+            # Bỏ các bản ghi cũ ở đỉnh heap để min F phản ánh đúng open set
+            for d in (0, 1):
+                while opens[d] and closeds[d][opens[d][0][2]] == gens[d]:
+                    heapq.heappop(opens[d])
+                    stale += 1
+            if not opens[0] or not opens[1]:
+                break
+            if opens[0][0][0] + opens[1][0][0] >= 2 * mu:
+                break
+
+            d = 0 if len(opens[0]) <= len(opens[1]) else 1
+            o = 1 - d
+            g, parent, seen, closed, gen = gs[d], parents[d], seens[d], closeds[d], gens[d]
+            other_g, other_seen, other_gen = gs[o], seens[o], gens[o]
+            tr, tc = targets[d]
+            br, bc = targets[o]
+
+            key, h, current = heapq.heappop(opens[d])
+            expanded += 1
+            closed[current] = gen
+            r, c = divmod(current, n)
+            cur_g = g[current]
+
+            if emit:
+                yield {'pos': (r, c), 'g': cur_g, 'h': h, 'f': cur_g + h, 'direction': names[d]}
+
+            tentative_g = cur_g + 1
+            for nb, nr, nc in ((current - n, r - 1, c), (current + n, r + 1, c),
+                               (current - 1, r, c - 1), (current + 1, r, c + 1)):
+                if nr < 0 or nr >= n or nc < 0 or nc >= n:
+                    continue
+                if blocked[nb] or closed[nb] == gen:
+                    continue
+                if seen[nb] != gen or tentative_g < g[nb]:
+                    seen[nb] = gen
+                    g[nb] = tentative_g
+                    parent[nb] = current
+                    nh = abs(nr - tr) + abs(nc - tc)
+                    nb_key = 2 * tentative_g + nh - abs(nr - br) - abs(nc - bc)
+                    heapq.heappush(opens[d], (nb_key, nh, nb))
+                    pushes += 1
+                    # Ô đã được phía bên kia chạm tới -> có một đường đi hoàn chỉnh
+                    if other_seen[nb] == other_gen and tentative_g + other_g[nb] < mu:
+                        mu = tentative_g + other_g[nb]
+                        meet = nb
+
+        if meet == -1:
+            return None, expanded, pushes, stale
+        return self._join_paths(parents, meet), expanded, pushes, stale
+
+    def _join_paths(self, parents, meet):
+        """
+        Ghép nửa đường từ Start đến ô gặp nhau với nửa đường từ ô gặp nhau đến Goal.
+        Returns: Danh sách tọa độ từ Start đến Goal.
+        """
+        forward = self._reconstruct_index_path(parents[0], meet)
+        backward = self._reconstruct_index_path(parents[1], meet)
+        return forward + backward[-2::-1]
+
+class LandmarkIndex:
+    """
+    Chỉ mục landmark cho heuristic ALT (A*, Landmarks, Triangle inequality).
+    Tiền xử lý một lần cho mỗi bản đồ tĩnh: chọn K landmark, lưu bảng khoảng cách BFS từ từng landmark.
+    Với mọi ô v và đích t: d(v, t) >= |d(L, t) - d(L, v)|, nên heuristic vẫn chấp nhận được (admissible)
+    và nhất quán; lấy max với Manhattan nên không bao giờ kém hơn heuristic cũ.
+    """
+    def __init__(self, n, landmarks, tables, fingerprint=None, build_time=0.0):
+        self.n = n
+        self.landmarks = list(landmarks)  # Chỉ số ô của các landmark
+        self.tables = tables              # np.ndarray int32 (K, n*n), -1 = không tới được
+        self.fingerprint = fingerprint
+        self.build_time = build_time      # Thời gian tiền xử lý (giây)
+        self._views = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_views'] = None
+        return state
+
+    @classmethod
+    def build(cls, maze_map, k=8, seed=None):
+        """
+        Chọn landmark theo chiến lược "xa nhất" (farthest): landmark đầu tiên là ô xa nhất
+        tính từ một ô trống ngẫu nhiên, mỗi landmark tiếp theo là ô có khoảng cách nhỏ nhất
+        tới các landmark đã chọn là lớn nhất.
+        Args:
+            maze_map: MazeMap hoặc GridMap.
+            k: Số landmark.
+            seed: Seed cho việc chọn ô khởi đầu.
+        Returns: LandmarkIndex.
+        """
+        t0 = time.perf_counter()
+        n = maze_map.n
+        blocked = obstacle_array(maze_map)
+        free = np.flatnonzero(blocked == 0)
+        if free.size == 0:
+            raise ValueError("Ban do khong co o trong")
+
+        rng = random.Random(seed)
+        seed_dist = bfs_distances(blocked, n, [int(free[rng.randrange(free.size)])])
+        landmarks = [int(np.argmax(seed_dist))]
+        tables = []
+        min_dist = None
+        while True:
+            table = bfs_distances(blocked, n, [landmarks[-1]])
+            tables.append(table)
+            # Ô không tới được từ landmark (-1) coi như ở rất xa để ưu tiên vùng chưa có landmark
+            reach = np.where(table >= 0, table, np.iinfo(np.int32).max)
+            min_dist = reach if min_dist is None else np.minimum(min_dist, reach)
+            if len(landmarks) >= k:
+                break
+            candidate_dist = np.where(blocked == 0, min_dist, -1)
+            nxt = int(np.argmax(candidate_dist))
+            if candidate_dist[nxt] <= 0:
+                break # Mọi ô trống đều đã là landmark
+            landmarks.append(nxt)
+
+        return cls(n, landmarks, np.vstack(tables), map_fingerprint(maze_map),
+                   time.perf_counter() - t0)
+
+    def save(self, filepath):
+        """
+        Lưu chỉ mục ra file .npz (thường đặt cạnh file bản đồ).
+        Args:
+            filepath: Đường dẫn file.
+        """
+        np.savez(filepath, n=self.n, landmarks=np.asarray(self.landmarks, dtype=np.int64),
+                 tables=self.tables, fingerprint=self.fingerprint or '',
+                 build_time=self.build_time)
+
+    @classmethod
+    def load(cls, filepath, maze_map=None):
+        """
+        Đọc chỉ mục từ file .npz.
+        Args:
+            filepath: Đường dẫn file.
+            maze_map: Nếu có, kiểm tra chỉ mục được tạo cho đúng bản đồ này.
+        Returns: LandmarkIndex.
+        """
+        with np.load(filepath) as data:
+            index = cls(int(data['n']), data['landmarks'].tolist(), data['tables'],
+                        str(data['fingerprint']) or None, float(data['build_time']))
+        if maze_map is not None and index.fingerprint != map_fingerprint(maze_map):
+            raise ValueError("Chi muc landmark khong khop voi ban do")
+        return index
+
+    def goal_terms(self, goal_idx):
+        """
+        Chuẩn bị dữ liệu heuristic cho một đích.
+        Args:
+            goal_idx: Chỉ số ô đích.
+        Returns: Danh sách (bảng khoảng cách dạng memoryview, d(L, goal)) của các landmark tới được Goal.
+        """
+        if self._views is None:
+            self._views = [memoryview(np.ascontiguousarray(t)) for t in self.tables]
+        return [(view, view[goal_idx]) for view in self._views if view[goal_idx] >= 0]
+
+    def lower_bound(self, pos, goal_pos):
+        """
+        Cận dưới ALT của khoảng cách giữa hai ô.
+        Args:
+            pos, goal_pos: Tuple (x, y).
+        """
+        goal = goal_pos[0] * self.n + goal_pos[1]
+        return _alt_bound(self.goal_terms(goal), pos[0] * self.n + pos[1], 0)
+
+    def evaluate(self, maze_map, pairs):
+        """
+        Đo hiệu quả: so sánh số node phải duyệt giữa Manhattan và ALT trên các cặp (start, goal).
+        Args:
+            maze_map: Bản đồ đã dùng để tạo chỉ mục.
+            pairs: Danh sách tuple (start, goal).
+        Returns: dict gồm build_time, tổng expanded của hai heuristic và tỉ lệ giảm.
+        """
+        plain = AStarSolver(maze_map, mode='array')
+        alt = AStarSolver(maze_map, mode='array', landmarks=self)
+        plain_expanded = alt_expanded = 0
+        for start, goal in pairs:
+            plain_expanded += plain.query(start, goal)[1]['expanded']
+            alt_expanded += alt.query(start, goal)[1]['expanded']
+        return {
+            'landmarks': len(self.landmarks),
+            'build_time': self.build_time,
+            'manhattan_expanded': plain_expanded,
+            'alt_expanded': alt_expanded,
+            'reduction': 1 - alt_expanded / plain_expanded if plain_expanded else 0.0,
+        }
+
+class DStarLitePlanner:
+    """
+    Lập kế hoạch tăng dần (incremental) D* Lite trên lưới 4 hướng.
+    Tìm kiếm ngược từ Goal về Start và giữ lại g/rhs giữa các lần gọi plan(): khi vật cản thay đổi,
+    chỉ các ô bị ảnh hưởng được cập nhật lại, nên thời gian sửa đường tỉ lệ với vùng thay đổi
+    thay vì phải chạy lại A* từ đầu.
+    Planner tự đăng ký listener trên bản đồ (set_obstacle); cũng có thể gọi on_obstacle_changed trực tiếp.
+    """
+    INF = float('inf')
+
+    def __init__(self, maze_map, start=None, goal=None, listen=True):
+        """
+        Args:
+            maze_map: MazeMap hoặc GridMap.
+            start, goal: Tuple (x, y), mặc định map.start / map.goal.
+            listen: Tự nhận sự kiện thay đổi vật cản từ bản đồ.
+        """
+        self.map = maze_map
+        self.n = maze_map.n
+        self.start = _as_cell(start, maze_map.start)
+        self.goal = _as_cell(goal, maze_map.goal)
+        self.stats = None
+        self._listening = False
+        if listen:
+            maze_map.add_listener(self.on_obstacle_changed)
+            self._listening = True
+        self.reset()
+
+    def close(self):
+        """Hủy đăng ký listener khỏi bản đồ."""
+        if self._listening:
+            self.map.remove_listener(self.on_obstacle_changed)
+            self._listening = False
+
+    def reset(self):
+        """Xóa toàn bộ trạng thái tìm kiếm (dùng khi bản đồ được sinh lại)."""
+        # Bản sao riêng: MazeMap không có mảng vật cản sẵn, GridMap thì có thể đã đổi trước khi plan() xử lý sự kiện
+        self._blocked = memoryview(np.array(obstacle_array(self.map), dtype=np.uint8))
+        self._start_idx = self.start[0] * self.n + self.start[1]
+        self._goal_idx = self.goal[0] * self.n + self.goal[1]
+        self._g = {}
+        self._rhs = {self._goal_idx: 0}
+        self._km = 0
+        self._last_start = self._start_idx
+        self._open = []
+        self._open_keys = {}
+        self._pending = {}
+        self._needs_reset = False
+        self._push(self._goal_idx, self._key(self._goal_idx))
+
+    def on_obstacle_changed(self, pos, is_obstacle):
+        """
+        Nhận sự kiện thêm/xóa vật cản; được xử lý ở lần plan() kế tiếp.
+        Args:
+            pos: Tuple (x, y) hoặc None nếu toàn bộ bản đồ đã thay đổi.
+            is_obstacle: Trạng thái mới của ô.
+        """
+        if pos is None:
+            self._needs_reset = True
+        else:
+            self._pending[pos[0] * self.n + pos[1]] = bool(is_obstacle)
+
+    def move_to(self, pos):
+        """
+        Cập nhật vị trí hiện tại của tác tử (Start mới) mà không phải tính lại từ đầu.
+        Args:
+            pos: Tuple (x, y).
+        """
+        self.start = tuple(pos)
+        self._start_idx = pos[0] * self.n + pos[1]
+
+    def plan(self):
+        """
+        Xử lý các thay đổi đang chờ rồi sửa lại đường đi ngắn nhất.
+        Returns: Danh sách tọa độ từ Start đến Goal, hoặc None nếu không có đường.
+            self.stats: expanded (số ô xử lý lại), changes (số ô vật cản thay đổi), time.
+        """
+        t0 = time.perf_counter()
+        if self._needs_reset:
+            self.reset()
+
+        if self._start_idx != self._last_start:
+            # Start đã di chuyển: bù km thay vì sắp xếp lại cả hàng đợi
+            self._km += self._h(self._last_start)
+            self._last_start = self._start_idx
+
+        changes = 0
+        for idx, is_obstacle in self._pending.items():
+            if bool(self._blocked[idx]) == is_obstacle:
+                continue
+            self._blocked[idx] = 1 if is_obstacle else 0
+            changes += 1
+            # Mọi cạnh nối với ô này đều đổi chi phí
+            self._update_vertex(idx)
+            for nb in self._neighbors(idx):
+                self._update_vertex(nb)
+        self._pending = {}
+
+        expanded = self._compute_shortest_path()
+        path = self._extract_path()
+        self.stats = {
+            'expanded': expanded,
+            'changes': changes,
+            'path_length': len(path) - 1 if path else None,
+            'time': time.perf_counter() - t0,
+        }
+        return path
+
+    def _h(self, idx):
+        # Heuristic Manhattan từ Start hiện tại tới ô idx
+        r, c = divmod(idx, self.n)
+        sr, sc = divmod(self._start_idx, self.n)
+        return abs(r - sr) + abs(c - sc)
+
+    def _key(self, idx):
+        m = min(self._g.get(idx, self.INF), self._rhs.get(idx, self.INF))
+        return (m + self._h(idx) + self._km, m)
+
+    def _push(self, idx, key):
+        self._open_keys[idx] = key
+        heapq.heappush(self._open, (key, idx))
+
+    def _neighbors(self, idx):
+        n = self.n
+        r, c = divmod(idx, n)
+        if r > 0: yield idx - n
+        if r < n - 1: yield idx + n
+        if c > 0: yield idx - 1
+        if c < n - 1: yield idx + 1
+
+    def _best_successor(self, idx):
+        """Returns: (1 + g nhỏ nhất trong các ô kề đi được, ô đó)."""
+        best, best_nb = self.INF, -1
+        if self._blocked[idx]:
+            return best, best_nb
+        for nb in self._neighbors(idx):
+            if self._blocked[nb]:
+                continue
+            cost = 1 + self._g.get(nb, self.INF)
+            if cost < best:
+                best, best_nb = cost, nb
+        return best, best_nb
+
+    def _update_vertex(self, idx):
+        if idx != self._goal_idx:
+            self._rhs[idx] = self._best_successor(idx)[0]
+        if self._g.get(idx, self.INF) != self._rhs.get(idx, self.INF):
+            self._push(idx, self._key(idx))
+        else:
+            self._open_keys.pop(idx, None)
+
+    def _compute_shortest_path(self):
+        start = self._start_idx
+        expanded = 0
+        while self._open:
+            key, idx = self._open[0]
+            if self._open_keys.get(idx) != key:
+                heapq.heappop(self._open) # Bản ghi cũ
+                continue
+            g_start = self._g.get(start, self.INF)
+            rhs_start = self._rhs.get(start, self.INF)
+            if not (key < self._key(start) or rhs_start != g_start):
+                break
+
+            heapq.heappop(self._open)
+            del self._open_keys[idx]
+            expanded += 1
+            new_key = self._key(idx)
+            g_idx = self._g.get(idx, self.INF)
+            rhs_idx = self._rhs.get(idx, self.INF)
+            if key < new_key:
+                self._push(idx, new_key)
+            elif g_idx > rhs_idx:
+                self._g[idx] = rhs_idx
+                for nb in self._neighbors(idx):
+                    self._update_vertex(nb)
+            else:
+                self._g[idx] = self.INF
+                self._update_vertex(idx)
+                for nb in self._neighbors(idx):
+                    self._update_vertex(nb)
+        return expanded
+
+    def _extract_path(self):
+        """Đi theo ô kề có 1 + g nhỏ nhất từ Start tới Goal."""
+        idx = self._start_idx
+        if self._g.get(idx, self.INF) == self.INF or self._blocked[idx]:
+            return None
+        path = [divmod(idx, self.n)]
+        for _ in range(self.n * self.n):
+            if idx == self._goal_idx:
+                return path
+            cost, idx = self._best_successor(idx)
+            if cost == self.INF:
+                return None
+            path.append(divmod(idx, self.n))
+        return None
+
+class _ClusterGrid:
+    """
+    Bản đồ con (C x C) của một cluster cho AStarSolver chế độ 'array'.
+    Phần nằm ngoài bản đồ gốc (cluster ở mép) được đệm bằng vật cản.
+    """
+    def __init__(self, size, obstacles):
+        self.n = size
+        self.obstacles = obstacles
+        self.start = (0, 0)
+        self.goal = (0, 0)
+
+class HPAStarSolver:
+    """
+    Tìm đường phân cấp HPA* (Hierarchical Path-finding A*) cho bản đồ rất lớn.
+        1. Chia lưới thành các cluster C x C. Trên mỗi đoạn biên chung giữa hai cluster kề nhau,
+           mỗi dải ô trống liên tiếp sinh một (dải ngắn) hoặc hai (dải dài) cửa (entrance).
+        2. Trong từng cluster, khoảng cách giữa các cửa được tính trước trên bản đồ con của cluster
+           (mỗi cửa một lần BFS, cho cùng độ dài với A* vì chi phí đều) -> đồ thị trừu tượng (được cache).
+        3. Truy vấn: nối Start/Goal vào các cửa của cluster chứa chúng, A* trên đồ thị trừu tượng,
+           rồi tinh chỉnh (refine) từng đoạn thành đường đi từng ô bằng AStarSolver trên bản đồ con khi cần.
+    Đường đi gần tối ưu (chỉ đi trong cluster giữa hai cửa). Khi một ô đổi vật cản, chỉ cluster chứa ô đó
+    (và cluster kề nếu ô nằm trên biên chung) bị đánh dấu để tính lại ở truy vấn kế tiếp.
+    """
+    # Dải ô trống trên biên dài từ mức này trở lên sinh 2 cửa ở hai đầu, ngắn hơn sinh 1 cửa ở giữa
+    LONG_ENTRANCE = 6
+
+    def __init__(self, maze_map, cluster_size=16, listen=True):
+        """
+        Args:
+            maze_map: MazeMap hoặc GridMap.
+            cluster_size: Kích thước cạnh cluster C.
+            listen: Tự nhận sự kiện thay đổi vật cản từ bản đồ để làm mất hiệu lực cache.
+        """
+        self.map = maze_map
+        self.n = maze_map.n
+        self.cluster_size = cluster_size
+        self.k = -(-self.n // cluster_size) # Số cluster mỗi chiều
+        self.stats = None
+        self.build_time = 0.0
+        self._built = False
+        self._listening = False
+        if listen:
+            maze_map.add_listener(self.on_obstacle_changed)
+            self._listening = True
+
+    def close(self):
+        """Hủy đăng ký listener khỏi bản đồ."""
+        if self._listening:
+            self.map.remove_listener(self.on_obstacle_changed)
+            self._listening = False
+
+    def build(self):
+        """Xây (lại) toàn bộ đồ thị trừu tượng."""
+        t0 = time.perf_counter()
+        self._blocked = np.array(obstacle_array(self.map), dtype=np.uint8).reshape(self.n, self.n)
+        self._borders = {}   # (cluster_a, cluster_b) -> [(ô phía a, ô phía b), ...]
+        self._inter = {}     # ô -> {ô kề ở cluster khác}: cạnh chi phí 1
+        self._intra = {}     # cluster -> {ô cửa: {ô cửa: khoảng cách}}
+        self._dirty_borders = set()
+        self._dirty_clusters = set()
+        for cr in range(self.k):
+            for cc in range(self.k):
+                if cc + 1 < self.k:
+                    self._dirty_borders.add(((cr, cc), (cr, cc + 1)))
+                if cr + 1 < self.k:
+                    self._dirty_borders.add(((cr, cc), (cr + 1, cc)))
+                self._dirty_clusters.add((cr, cc))
+        self._built = True
+        self._refresh()
+        self.build_time = time.perf_counter() - t0
+
+    def on_obstacle_changed(self, pos, is_obstacle):
+        """
+        Nhận sự kiện thêm/xóa vật cản và đánh dấu các cluster/biên bị ảnh hưởng.
+        Args:
+            pos: Tuple (x, y) hoặc None nếu toàn bộ bản đồ đã thay đổi.
+            is_obstacle: Trạng thái mới của ô.
+        """
+        if not self._built:
+            return
+        if pos is None:
+            self._built = False
+            return
+        r, c = pos
+        self._blocked[r, c] = 1 if is_obstacle else 0
+        C = self.cluster_size
+        cl = (r // C, c // C)
+        self._dirty_clusters.add(cl)
+        # Ô nằm trên biên chung -> cửa của biên đó và cluster bên kia cũng đổi
+        for nb, on_edge in (((cl[0] - 1, cl[1]), r % C == 0),
+                            ((cl[0] + 1, cl[1]), r % C == C - 1),
+                            ((cl[0], cl[1] - 1), c % C == 0),
+                            ((cl[0], cl[1] + 1), c % C == C - 1)):
+            if on_edge and 0 <= nb[0] < self.k and 0 <= nb[1] < self.k:
+                self._dirty_borders.add((min(cl, nb), max(cl, nb)))
+                self._dirty_clusters.add(nb)
+
+    def query(self, start=None, goal=None, refine=True):
+        """
+        Tìm đường từ start đến goal.
+        Args:
+            start, goal: Tuple (x, y), mặc định map.start / map.goal.
+            refine: True trả về đường đi từng ô; False chỉ trả về các điểm mốc trừu tượng
+                    (có thể tinh chỉnh sau bằng refine_path).
+        Returns: Danh sách tọa độ, hoặc None nếu không có đường.
+            self.stats: abstract_expanded, path_length, time.
+        """
+        t0 = time.perf_counter()
+        if not self._built:
+            self.build()
+        elif self._dirty_borders or self._dirty_clusters:
+            self._refresh()
+        start = _as_cell(start, self.map.start)
+        goal = _as_cell(goal, self.map.goal)
+
+        waypoints, expanded = self._abstract_search(start, goal)
+        path = waypoints
+        if waypoints is not None and refine:
+            path = self.refine_path(waypoints)
+        self.stats = {
+            'abstract_expanded': expanded,
+            'path_length': len(path) - 1 if path and refine else None,
+            'time': time.perf_counter() - t0,
+        }
+        return path
+
+    def refine_path(self, waypoints):
+        """
+        Tinh chỉnh đường đi trừu tượng thành đường đi từng ô.
+        Args:
+            waypoints: Danh sách tọa độ điểm mốc (Start, các cửa, Goal).
+        Returns: Danh sách tọa độ từng ô từ Start đến Goal.
+        """
+        path = [waypoints[0]]
+        for u, v in zip(waypoints, waypoints[1:]):
+            if self._cluster_of(u) == self._cluster_of(v):
+                segment = self._local_path(self._cluster_of(u), u, v)
+                path.extend(segment[1:])
+            else:
+                path.append(v) # Cạnh giữa hai cluster: hai ô kề nhau
+        return path
+
+    def evaluate(self, pairs):
+        """
+        So sánh với AStarSolver phẳng trên cùng bản đồ.
+        Args:
+            pairs: Danh sách tuple (start, goal).
+        Returns: dict gồm thời gian xây đồ thị, tổng thời gian truy vấn hai cách,
+                 độ dài trung bình/lớn nhất của đường HPA* so với đường tối ưu (suboptimality).
+        """
+        if not self._built:
+            self.build()
+        flat = AStarSolver(self.map, mode='array')
+        hpa_time = flat_time = 0.0
+        ratios = []
+        for start, goal in pairs:
+            path = self.query(start, goal)
+            hpa_time += self.stats['time']
+            flat_path, flat_stats = flat.query(start, goal)
+            flat_time += flat_stats['time']
+            if path and flat_path and len(flat_path) > 1:
+                ratios.append((len(path) - 1) / (len(flat_path) - 1))
+        return {
+            'build_time': self.build_time,
+            'hpa_query_time': hpa_time,
+            'flat_query_time': flat_time,
+            'mean_suboptimality': sum(ratios) / len(ratios) if ratios else None,
+            'max_suboptimality': max(ratios) if ratios else None,
+        }
+
+    def _cluster_of(self, pos):
+        return (pos[0] // self.cluster_size, pos[1] // self.cluster_size)
+
+    def _cluster_grid(self, cl):
+        C = self.cluster_size
+        r0, c0 = cl[0] * C, cl[1] * C
+        block = self._blocked[r0:r0 + C, c0:c0 + C]
+        padded = np.ones((C, C), dtype=np.uint8)
+        padded[:block.shape[0], :block.shape[1]] = block
+        return _ClusterGrid(C, padded.ravel())
+
+    def _local_path(self, cl, u, v):
+        """A* (AStarSolver) giữa hai ô trong cùng một cluster, trả về tọa độ toàn cục."""
+        C = self.cluster_size
+        r0, c0 = cl[0] * C, cl[1] * C
+        solver = AStarSolver(self._cluster_grid(cl), mode='array')
+        path, _ = solver._search((u[0] - r0, u[1] - c0), (v[0] - r0, v[1] - c0), TRACE_OFF)
+        if path is None:
+            return None
+        return [(r + r0, c + c0) for r, c in path]
+
+    def _border_transitions(self, a, b):
+        """Tìm các cặp ô cửa trên biên chung giữa cluster a và b (a đứng trước b)."""
+        C = self.cluster_size
+        n = self.n
+        if a[0] == b[0]:
+            # Biên dọc: cột cuối của a và cột đầu của b
+            ca, cb = b[1] * C - 1, b[1] * C
+            cells = [((r, ca), (r, cb)) for r in range(a[0] * C, min((a[0] + 1) * C, n))]
+        else:
+            # Biên ngang: hàng cuối của a và hàng đầu của b
+            ra, rb = b[0] * C - 1, b[0] * C
+            cells = [((ra, c), (rb, c)) for c in range(a[1] * C, min((a[1] + 1) * C, n))]
+
+        transitions = []
+        run = []
+        for pa, pb in cells + [(None, None)]:
+            if pa is not None and not self._blocked[pa] and not self._blocked[pb]:
+                run.append((pa, pb))
+                continue
+            if run:
+                if len(run) >= self.LONG_ENTRANCE:
+                    transitions.extend((run[0], run[-1]))
+                else:
+                    transitions.append(run[len(run) // 2])
+                run = []
+        return transitions
+
+    def _refresh(self):
+        """Tính lại các biên và cluster đang bị đánh dấu."""
+        for border in self._dirty_borders:
+            for pa, pb in self._borders.get(border, ()):
+                self._inter[pa].discard(pb)
+                self._inter[pb].discard(pa)
+            transitions = self._border_transitions(*border)
+            self._borders[border] = transitions
+            for pa, pb in transitions:
+                self._inter.setdefault(pa, set()).add(pb)
+                self._inter.setdefault(pb, set()).add(pa)
+        self._dirty_borders = set()
+
+        for cl in self._dirty_clusters:
+            entrances = self._cluster_entrances(cl)
+            grid = self._cluster_grid(cl)
+            edges = {}
+            for u in entrances:
+                edges[u] = {v: d for v, d in self._local_distances(cl, grid, u, entrances).items()
+                            if v != u}
+            self._intra[cl] = edges
+        self._dirty_clusters = set()
+
+    def _cluster_entrances(self, cl):
+        cells = set()
+        cr, cc = cl
+        for nb in ((cr - 1, cc), (cr + 1, cc), (cr, cc - 1), (cr, cc + 1)):
+            border = (min(cl, nb), max(cl, nb))
+            for pa, pb in self._borders.get(border, ()):
+                cells.add(pa if border[0] == cl else pb)
+        return sorted(cells)
+
+    def _local_distances(self, cl, grid, pos, entrances):
+        """
+        Khoảng cách trong cluster từ pos tới mọi cửa của cluster: một lần BFS trên bản đồ con
+        cho ra đúng độ dài đường A* tới tất cả các cửa cùng lúc (chi phí mỗi bước bằng 1).
+        Bản đồ con chỉ C x C ô nên BFS bằng deque nhanh hơn bfs_distances (tốn chi phí cố định mỗi lớp).
+        Returns: dict ô cửa -> khoảng cách (chỉ các cửa tới được).
+        """
+        C = self.cluster_size
+        r0, c0 = cl[0] * C, cl[1] * C
+        blocked = memoryview(grid.obstacles)
+        source = (pos[0] - r0) * C + pos[1] - c0
+        dist = {source: 0}
+        queue = deque([source])
+        while queue:
+            cur = queue.popleft()
+            r, c = divmod(cur, C)
+            d = dist[cur] + 1
+            for nb, ok in ((cur - C, r > 0), (cur + C, r < C - 1), (cur - 1, c > 0), (cur + 1, c < C - 1)):
+                if ok and not blocked[nb] and nb not in dist:
+                    dist[nb] = d
+                    queue.append(nb)
+        edges = {}
+        for cell in entrances:
+            d = dist.get((cell[0] - r0) * C + cell[1] - c0)
+            if d is not None:
+                edges[cell] = d
+        return edges
+
+    def _endpoint_edges(self, pos):
+        """Khoảng cách (trong cluster) từ một ô bất kỳ tới các cửa của cluster chứa nó."""
+        cl = self._cluster_of(pos)
+        return self._local_distances(cl, self._cluster_grid(cl), pos, self._intra.get(cl, {}))
+
+    def _abstract_search(self, start, goal):
+        """
+        A* trên đồ thị trừu tượng, với Start/Goal được nối tạm vào các cửa của cluster chứa chúng.
+        Returns: (danh sách điểm mốc hoặc None, số node trừu tượng đã duyệt)
+        """
+        if self._blocked[start] or self._blocked[goal]:
+            return None, 0
+        start_edges = self._endpoint_edges(start)
+        goal_edges = self._endpoint_edges(goal)
+        if self._cluster_of(start) == self._cluster_of(goal):
+            direct = self._local_path(self._cluster_of(start), start, goal)
+            if direct is not None:
+                start_edges[goal] = len(direct) - 1
+
+        def neighbors(u):
+            if u == start:
+                yield from start_edges.items()
+            # Start/Goal có thể trùng một ô cửa -> vẫn dùng các cạnh sẵn có của ô đó
+            yield from self._intra[self._cluster_of(u)].get(u, {}).items()
+            for v in self._inter.get(u, ()):
+                yield v, 1
+            if u in goal_edges:
+                yield goal, goal_edges[u]
+
+        gr, gc = goal
+        h0 = abs(start[0] - gr) + abs(start[1] - gc)
+        g_score = {start: 0}
+        parent = {start: None}
+        closed_set = set()
+        open_set = [(h0, h0, start)]
+        expanded = 0
+        while open_set:
+            f, h, u = heapq.heappop(open_set)
+            if u in closed_set:
+                continue
+            expanded += 1
+            if u == goal:
+                path = []
+                while u is not None:
+                    path.append(u)
+                    u = parent[u]
+                return path[::-1], expanded
+            closed_set.add(u)
+            for v, w in neighbors(u):
+                tentative_g = g_score[u] + w
+                if v not in closed_set and tentative_g < g_score.get(v, float('inf')):
+                    g_score[v] = tentative_g
+                    parent[v] = u
+                    nh = abs(v[0] - gr) + abs(v[1] - gc)
+                    heapq.heappush(open_set, (tentative_g + nh, nh, v))
+        return None, expanded
+
+class ComponentIndex:
+    """
+    Chỉ mục thành phần liên thông của các ô trống, xây một lần cho mỗi bản đồ (label_components)
+    và được cập nhật theo sự kiện thay đổi vật cản:
+        - Xóa vật cản: ô mới nối các thành phần kề nó -> gộp nhãn bằng union-find trên nhãn, O(1).
+        - Thêm vật cản: thành phần chứa ô có thể bị tách -> đánh dấu, chỉ gán nhãn lại thành phần đó
+          (vector hóa) khi có truy vấn chạm vào nó.
+    Hai ô có gốc nhãn khác nhau chắc chắn không có đường (thành phần chỉ gộp qua sự kiện đã ghi nhận).
+    """
+    def __init__(self, maze_map, listen=True):
+        """
+        Args:
+            maze_map: MazeMap hoặc GridMap.
+            listen: Tự nhận sự kiện thay đổi vật cản từ bản đồ.
+        """
+        self.map = maze_map
+        self.n = maze_map.n
+        self._listening = False
+        if listen:
+            maze_map.add_listener(self.on_obstacle_changed)
+            self._listening = True
+        self.build()
+
+    def __getstate__(self):
+        # Gửi sang tiến trình con (solve_many) như một bản chụp chỉ đọc, không kèm bản đồ
+        state = self.__dict__.copy()
+        state['map'] = None
+        state['_listening'] = False
+        return state
+
+    def close(self):
+        """Hủy đăng ký listener khỏi bản đồ."""
+        if self._listening:
+            self.map.remove_listener(self.on_obstacle_changed)
+            self._listening = False
+
+    def build(self):
+        """Gán nhãn lại toàn bộ bản đồ."""
+        t0 = time.perf_counter()
+        self._labels = label_components(obstacle_array(self.map), self.n)
+        self._alias = list(range(int(self._labels.max()) + 1)) # Union-find trên nhãn
+        self._dirty = set()
+        self._needs_build = False
+        self.build_time = time.perf_counter() - t0
+
+    @property
+    def num_components(self):
+        """Số thành phần liên thông hiện tại (gán nhãn lại các thành phần đang bị đánh dấu)."""
+        self._flush()
+        for root in list(self._dirty):
+            self._relabel(root)
+        labels = self._labels[self._labels >= 0]
+        return int(np.unique(self._roots()[labels]).size)
+
+    def on_obstacle_changed(self, pos, is_obstacle):
+        """
+        Nhận sự kiện thêm/xóa vật cản.
+        Args:
+            pos: Tuple (x, y) hoặc None nếu toàn bộ bản đồ đã thay đổi.
+            is_obstacle: Trạng thái mới của ô.
+        """
+        if pos is None:
+            self._needs_build = True
+            return
+        n = self.n
+        r, c = pos
+        idx = r * n + c
+        labels = self._labels
+        if is_obstacle:
+            label = labels[idx]
+            if label >= 0:
+                labels[idx] = -1
+                self._dirty.add(self._find(int(label)))
+            return
+        if labels[idx] >= 0:
+            return
+        roots = set()
+        for nb, ok in ((idx - n, r > 0), (idx + n, r < n - 1), (idx - 1, c > 0), (idx + 1, c < n - 1)):
+            if ok and labels[nb] >= 0:
+                roots.add(self._find(int(labels[nb])))
+        if not roots:
+            self._alias.append(len(self._alias))
+            labels[idx] = len(self._alias) - 1
+            return
+        keep = min(roots)
+        for root in roots:
+            if root != keep:
+                self._alias[root] = keep
+                if root in self._dirty:
+                    self._dirty.discard(root)
+                    self._dirty.add(keep)
+        labels[idx] = keep
+
+    def component_of(self, pos):
+        """
+        Returns: Mã thành phần liên thông của ô, hoặc -1 nếu là vật cản.
+        """
+        self._flush()
+        label = self._labels[pos[0] * self.n + pos[1]]
+        if label < 0:
+            return -1
+        root = self._find(int(label))
+        if root in self._dirty:
+            self._relabel(root)
+            root = self._find(int(self._labels[pos[0] * self.n + pos[1]]))
+        return root
+
+    def connected(self, a, b):
+        """
+        Kiểm tra hai ô có cùng thành phần liên thông (có đường đi) hay không.
+        Args:
+            a, b: Tuple (x, y).
+        """
+        self._flush()
+        la = self._labels[a[0] * self.n + a[1]]
+        lb = self._labels[b[0] * self.n + b[1]]
+        if la < 0 or lb < 0:
+            return False
+        if self._find(int(la)) != self._find(int(lb)):
+            return False
+        return self.component_of(a) == self.component_of(b)
+
+    def _flush(self):
+        if self._needs_build:
+            self.build()
+
+    def _find(self, label):
+        alias = self._alias
+        root = label
+        while alias[root] != root:
+            root = alias[root]
+        while alias[label] != root: # Nén đường
+            alias[label], label = root, alias[label]
+        return root
+
+    def _roots(self):
+        """Gốc của mọi nhãn, tính vector hóa bằng nhảy con trỏ trên bảng alias."""
+        roots = np.asarray(self._alias, dtype=np.int32)
+        while True:
+            nxt = roots[roots]
+            if np.array_equal(nxt, roots):
+                return roots
+            roots = nxt
+
+    def _relabel(self, root):
+        """Gán nhãn lại riêng thành phần có gốc root (có thể đã bị tách bởi vật cản mới)."""
+        roots = self._roots()
+        labels = self._labels
+        mask = labels >= 0
+        mask[mask] = roots[labels[mask]] == root
+        parts = label_components(None, self.n, mask)
+        offset = len(self._alias)
+        count = int(parts.max()) + 1
+        self._alias.extend(range(offset, offset + count))
+        labels[mask] = parts[mask] + offset
+        self._dirty.discard(root)
+
+class DistanceFieldCache:
+    """
+    Trường khoảng cách nhiều-về-một: với mỗi Goal, tính một lần khoảng cách chính xác từ Goal
+    đến mọi ô đến được (bfs_distances, vector hóa theo lớp sóng). Mọi tác tử cùng đi đến Goal đó
+    chỉ cần đi theo chiều giảm của trường (gradient descent), không phải chạy A* riêng.
+    Trường được cache theo (map.version, goal) và loại bỏ theo LRU khi vượt max_bytes;
+    khi bản đồ đổi version, các trường cũ bị bỏ ngay.
+    """
+    def __init__(self, maze_map, max_bytes=64 * 2 ** 20):
+        """
+        Args:
+            maze_map: MazeMap hoặc GridMap.
+            max_bytes: Tổng dung lượng tối đa của các trường trong cache (luôn giữ ít nhất một trường).
+        """
+        self.map = maze_map
+        self.n = maze_map.n
+        self.max_bytes = max_bytes
+        self._fields = OrderedDict() # (version, goal) -> np.ndarray int32 (n*n), chỉ đọc
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._fields)
+
+    def field(self, goal=None):
+        """
+        Trường khoảng cách tới goal (tính và cache nếu chưa có).
+        Args:
+            goal: Tuple (x, y), mặc định map.goal.
+        Returns: np.ndarray int32 chỉ đọc kích thước n*n - khoảng cách tới goal, -1 nếu không tới được.
+        """
+        goal = _as_cell(goal, self.map.goal)
+        version = getattr(self.map, 'version', 0)
+        key = (version, goal)
+        with self._lock:
+            dist = self._fields.get(key)
+            if dist is not None:
+                self._fields.move_to_end(key)
+                self.hits += 1
+                return dist
+            self.misses += 1
+
+        dist = bfs_distances(obstacle_array(self.map), self.n, [goal[0] * self.n + goal[1]])
+        dist.setflags(write=False)
+
+        with self._lock:
+            # Bản đồ đã đổi: bỏ các trường của version cũ
+            for old in [k for k in self._fields if k[0] != version]:
+                self._nbytes -= self._fields.pop(old).nbytes
+            if key not in self._fields:
+                self._fields[key] = dist
+                self._nbytes += dist.nbytes
+            while self._nbytes > self.max_bytes and len(self._fields) > 1:
+                _, evicted = self._fields.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+                self.evictions += 1
+        return dist
+
+    def distance(self, start, goal=None):
+        """
+        Returns: Độ dài đường đi ngắn nhất từ start đến goal, hoặc None nếu không có đường.
+        """
+        d = int(self.field(goal)[start[0] * self.n + start[1]])
+        return d if d >= 0 else None
+
+    def path(self, start, goal=None):
+        """
+        Đọc đường đi ngắn nhất bằng cách đi xuống theo gradient của trường: mỗi bước chọn ô lân cận
+        có khoảng cách nhỏ hơn đúng 1 (thứ tự Lên, Xuống, Trái, Phải).
+        Args:
+            start: Tuple (x, y).
+            goal: Tuple (x, y), mặc định map.goal.
+        Returns: Danh sách tọa độ từ start đến goal, hoặc None nếu không có đường.
+        """
+        dist = memoryview(self.field(goal))
+        n = self.n
+        r, c = start
+        d = dist[r * n + c]
+        if d < 0:
+            return None
+        path = [(r, c)]
+        while d > 0:
+            for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                if 0 <= nr < n and 0 <= nc < n and dist[nr * n + nc] == d - 1:
+                    r, c = nr, nc
+                    break
+            d -= 1
+            path.append((r, c))
+        return path
+
+    def paths(self, starts, goal=None):
+        """
+        Đường đi của nhiều tác tử về cùng một goal (dùng chung một trường).
+        Returns: Danh sách path (hoặc None) theo thứ tự của starts.
+        """
+        self.field(goal)
+        return [self.path(tuple(s), goal) for s in starts]
+
+    def clear(self):
+        """Xóa toàn bộ cache."""
+        with self._lock:
+            self._fields.clear()
+            self._nbytes = 0
+
+    @property
+    def nbytes(self):
+        """Dung lượng hiện tại của các trường trong cache (byte)."""
+        return self._nbytes
+
+    def hit_rate(self):
+        """Tỉ lệ truy cập trúng cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+class PathCache:
+    """
+    Cache đường đi đặt trước một solver (AStarSolver hoặc lớp con), khóa theo (map.version, start, goal).
+    - Dung lượng giới hạn bởi max_entries, loại bỏ theo LRU.
+    - Bị xóa ngay khi bản đồ báo thay đổi vật cản (listener của set_obstacle / sinh lại bản đồ);
+      khóa chứa version nên bản đồ không có listener cũng không trả về kết quả cũ.
+    - Tái dùng đường con: mọi đoạn con của một đường đi ngắn nhất cũng là ngắn nhất (lưới 4 hướng,
+      chi phí đều, đi được hai chiều), nên truy vấn có Start và Goal cùng nằm trên một đường đã cache
+      được trả lời bằng một lát cắt của đường đó. Chỉ bật khi solver tìm đường tối ưu (weight = 1).
+    """
+    def __init__(self, solver, max_entries=1024, listen=True):
+        """
+        Args:
+            solver: Solver có phương thức query(start, goal) -> (path, stats).
+            max_entries: Số đường đi tối đa trong cache.
+            listen: Tự nhận sự kiện thay đổi vật cản từ bản đồ để xóa cache.
+        """
+        self.solver = solver
+        self.map = solver.map
+        self.max_entries = max_entries
+        self.reuse_subpaths = getattr(solver, 'weight', 1) == 1
+        self._paths = OrderedDict() # (version, start, goal) -> path hoặc None
+        self._index = {}            # pos -> {khóa: vị trí của pos trong path}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.subpath_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._listening = False
+        if listen and hasattr(self.map, 'add_listener'):
+            self.map.add_listener(self.on_obstacle_changed)
+            self._listening = True
+
+    def __len__(self):
+        return len(self._paths)
+
+    def close(self):
+        """Hủy đăng ký listener khỏi bản đồ."""
+        if self._listening:
+            self.map.remove_listener(self.on_obstacle_changed)
+            self._listening = False
+
+    def on_obstacle_changed(self, pos, is_obstacle):
+        """Bản đồ thay đổi: mọi đường đi đã cache không còn đảm bảo đúng."""
+        self.clear()
+        self.invalidations += 1
+
+    def clear(self):
+        """Xóa toàn bộ cache."""
+        with self._lock:
+            self._paths.clear()
+            self._index.clear()
+
+    def get_path(self, start=None, goal=None):
+        """
+        Đường đi từ start đến goal: lấy từ cache (trùng khóa hoặc đường con) nếu có, ngược lại gọi solver.
+        Args:
+            start, goal: Tuple (x, y), mặc định map.start / map.goal.
+        Returns: Danh sách tọa độ từ start đến goal, hoặc None nếu không có đường.
+        """
+        start = _as_cell(start, self.map.start)
+        goal = _as_cell(goal, self.map.goal)
+        version = getattr(self.map, 'version', 0)
+        key = (version, start, goal)
+        with self._lock:
+            if key in self._paths:
+                self._paths.move_to_end(key)
+                self.hits += 1
+                path = self._paths[key]
+                return list(path) if path is not None else None
+            if self.reuse_subpaths:
+                path = self._find_subpath(version, start, goal)
+                if path is not None:
+                    self.subpath_hits += 1
+                    return path
+            self.misses += 1
+
+        path, _ = self.solver.query(start, goal)
+
+        with self._lock:
+            if getattr(self.map, 'version', 0) == version and key not in self._paths:
+                self._store(key, path)
+        return list(path) if path is not None else None
+
+    def hit_rate(self):
+        """Tỉ lệ truy vấn được trả lời từ cache (kể cả đường con)."""
+        total = self.hits + self.subpath_hits + self.misses
+        return (self.hits + self.subpath_hits) / total if total else 0.0
+
+    def stats(self):
+        """
+        Returns: dict gồm entries, hits, subpath_hits, misses, evictions, invalidations, hit_rate.
+        """
+        return {
+            'entries': len(self._paths),
+            'hits': self.hits,
+            'subpath_hits': self.subpath_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hit_rate(),
+        }
+
+    def _find_subpath(self, version, start, goal):
+        """Tìm một đường đã cache (cùng version) đi qua cả start và goal, trả về đoạn giữa hai ô."""
+        at_start = self._index.get(start)
+        at_goal = self._index.get(goal)
+        if not at_start or not at_goal:
+            return None
+        if len(at_start) > len(at_goal):
+            at_start, at_goal = at_goal, at_start
+            start, goal = goal, start
+            swapped = True
+        else:
+            swapped = False
+        for key, i in at_start.items():
+            j = at_goal.get(key)
+            if j is None or key[0] != version:
+                continue
+            self._paths.move_to_end(key)
+            path = self._paths[key]
+            sub = path[i:j + 1] if i <= j else path[j:i + 1][::-1]
+            return sub[::-1] if swapped else sub
+
+    def _store(self, key, path):
+        self._paths[key] = path
+        if path is not None and self.reuse_subpaths:
+            for i, pos in enumerate(path):
+                self._index.setdefault(pos, {})[key] = i
+        while len(self._paths) > self.max_entries:
+            old_key, old_path = self._paths.popitem(last=False)
+            self.evictions += 1
+            if old_path is not None and self.reuse_subpaths:
+                for pos in old_path:
+                    entries = self._index.get(pos)
+                    if entries is not None:
+                        entries.pop(old_key, None)
+                        if not entries:
+                            del self._index[pos]
@@ -1,9 +1,63 @@
 import random
 import numpy as np
 import math
-import matplotlib.pyplot as plt
 import os
-from cores import AStarSolver
+from cores import AStarSolver, obstacle_array, TRACE_COUNTERS, TRACE_FULL
+
+# Định dạng file bản đồ nhị phân (GridMap.save / GridMap.load):
+#   byte 0-7:   MAP_MAGIC
+#   byte 8-55:  6 số uint64 little-endian: n, start_r, start_c, goal_r, goal_c, phiên bản định dạng
+#   byte 64-:   n*n byte vật cản (uint8, hàng nối tiếp hàng), có thể memory-map trực tiếp
+MAP_MAGIC = b'ASTARMAP'
+MAP_HEADER_SIZE = 64
+MAP_FORMAT_VERSION = 1
+
+def make_rng(seed=None, rng=None):
+    """
+    Tạo bộ sinh số ngẫu nhiên NumPy.
+    Args:
+        seed: Seed cố định (tái lập được bản đồ).
+        rng: np.random.Generator có sẵn (ưu tiên hơn seed).
+    Returns: np.random.Generator. Không truyền gì thì lấy seed từ module random,
+             nên random.seed(...) vẫn tái lập được như trước.
+    """
+    if rng is not None:
+        return rng
+    if seed is None:
+        seed = random.getrandbits(64)
+    return np.random.default_rng(seed)
+
+def random_obstacles(n, density, start=None, goal=None, rng=None):
+    """
+    Sinh vật cản vector hóa: chọn đúng int(n*n*density) ô trong một lần lấy mẫu không hoàn lại,
+    không có vòng lặp loại bỏ (rejection) nên tốc độ không phụ thuộc mật độ.
+    Args:
+        n: Kích thước lưới.
+        density: Mật độ vật cản.
+        start, goal: Tuple (x, y) hoặc None để chọn ngẫu nhiên (Goal khác Start).
+        rng: np.random.Generator.
+    Returns: (start, goal, mảng vật cản phẳng uint8 n*n) - Start/Goal luôn trống.
+    """
+    rng = make_rng(rng=rng)
+    size = n * n
+    if start is None:
+        start = divmod(int(rng.integers(size)), n)
+    if goal is None:
+        # Chọn trong size - 1 ô còn lại rồi dịch qua ô Start
+        idx = int(rng.integers(size - 1))
+        if idx >= start[0] * n + start[1]:
+            idx += 1
+        goal = divmod(idx, n)
+    start, goal = tuple(start), tuple(goal)
+
+    excluded = sorted({start[0] * n + start[1], goal[0] * n + goal[1]})
+    num_obstacles = min(int(size * density), size - len(excluded))
+    picked = rng.choice(size - len(excluded), size=num_obstacles, replace=False)
+    for e in excluded: # Ánh xạ [0, size - k) sang các ô khác Start/Goal
+        picked += picked >= e
+    flat = np.zeros(size, dtype=np.uint8)
+    flat[picked] = 1
+    return start, goal, flat
 
 class Node:
     """
@@ -35,75 +89,235 @@ class Node:
             return self.h < other.h
         return self.f < other.f
 
-class MazeMap:
+class ObservableMap:
+    """
+    Phần dùng chung của MazeMap và GridMap: số phiên bản (version) và danh sách listener
+    được gọi mỗi khi vật cản thay đổi qua set_obstacle.
+    Listener có dạng callback(pos, is_obstacle); pos = None nghĩa là toàn bộ bản đồ đã được sinh lại.
+    """
+    def _init_events(self):
+        self.version = 0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Đăng ký callback(pos, is_obstacle) nhận sự kiện thay đổi vật cản."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def set_obstacle(self, r, c, is_obstacle=True):
+        """
+        Thêm/xóa vật cản tại một ô, tăng version và báo cho các listener.
+        Args:
+            r, c: Tọa độ ô.
+            is_obstacle: True để thêm vật cản, False để xóa.
+        Returns: True nếu ô thực sự thay đổi.
+        """
+        if self.is_obstacle(r, c) == is_obstacle:
+            return False
+        self._write_obstacle(r, c, is_obstacle)
+        self.version += 1
+        self._notify((r, c), is_obstacle)
+        return True
+
+    def _notify(self, pos, is_obstacle):
+        for callback in list(self._listeners):
+            callback(pos, is_obstacle)
+
+    def _map_regenerated(self):
+        self.version += 1
+        self._notify(None, None)
+
+    def __getstate__(self):
+        # Listener (thường là phương thức của planner/cache) không gửi sang tiến trình khác
+        state = self.__dict__.copy()
+        state['_listeners'] = []
+        return state
+
+class MazeMap(ObservableMap):
     """
     Quản lý lưới mê cung, vật cản, điểm đầu/cuối.
+    Thay đổi vật cản sau khi sinh bản đồ nên đi qua set_obstacle để các solver/planner nhận được sự kiện.
     """
     def __init__(self, n):
         self.n = n
         self.grid = []
         self.start = (0, 0)
         self.goal = (n-1, n-1)
+        self._init_events()
         self._init_grid()
 
     def _init_grid(self):
         self.grid = [[Node(r, c) for c in range(self.n)] for r in range(self.n)]
 
-    def generate_random_map(self, density=0.2, manual_start=None, manual_goal=None):
+    def is_obstacle(self, r, c):
+        return self.grid[r][c].is_obstacle
+
+    def _write_obstacle(self, r, c, is_obstacle):
+        self.grid[r][c].is_obstacle = is_obstacle
+
+    def generate_random_map(self, density=0.2, manual_start=None, manual_goal=None, seed=None, rng=None):
         """
         Sinh bản đồ với tùy chọn Start/Goal thủ công hoặc ngẫu nhiên.
         Args:
             density: Mật độ vật cản.
             manual_start: Tuple (x, y) hoặc None.
             manual_goal: Tuple (x, y) hoặc None.
+            seed: Seed để sinh lại đúng bản đồ này (bỏ qua nếu truyền rng).
+            rng: np.random.Generator dùng để sinh.
         """
         self._init_grid() # Reset lưới
-        
-        # 1. Xử lý điểm Start
-        if manual_start:
-            self.start = manual_start
-        else:
-            # Random toàn bộ sàn
-            self.start = (random.randint(0, self.n-1), random.randint(0, self.n-1))
-            
-        # 2. Xử lý điểm Goal
-        if manual_goal:
-            self.goal = manual_goal
+        self.start, self.goal, flat = random_obstacles(self.n, density, manual_start, manual_goal,
+                                                       make_rng(seed, rng))
+        for idx in np.flatnonzero(flat):
+            r, c = divmod(int(idx), self.n)
+            self.grid[r][c].is_obstacle = True
+
+        self._map_regenerated()
+
+class GridMap(ObservableMap):
+    """
+    Bản đồ lưới dạng mảng gọn cho lưới rất lớn (10^6 - 10^7 ô).
+    Không tạo Node cho từng ô: vật cản lưu trong một mảng NumPy uint8 phẳng,
+    ô (r, c) ứng với chỉ số r * n + c. Dùng với AStarSolver ở chế độ 'array'.
+    """
+    def __init__(self, n):
+        self.n = n
+        self.obstacles = np.zeros(n * n, dtype=np.uint8)
+        self.start = (0, 0)
+        self.goal = (n-1, n-1)
+        self._init_events()
+
+    @classmethod
+    def from_maze(cls, maze):
+        """
+        Chuyển MazeMap (lưới Node) sang GridMap.
+        Args:
+            maze: MazeMap object.
+        Returns: GridMap cùng vật cản, Start, Goal.
+        """
+        grid_map = cls(maze.n)
+        for r in range(maze.n):
+            for c in range(maze.n):
+                if maze.grid[r][c].is_obstacle:
+                    grid_map.obstacles[r * maze.n + c] = 1
+        grid_map.start = maze.start
+        grid_map.goal = maze.goal
+        return grid_map
+
+    def to_index(self, pos):
+        """Tọa độ (r, c) -> chỉ số ô."""
+        return pos[0] * self.n + pos[1]
+
+    def to_pos(self, idx):
+        """Chỉ số ô -> tọa độ (r, c)."""
+        return divmod(int(idx), self.n)
+
+    def is_obstacle(self, r, c):
+        return bool(self.obstacles[r * self.n + c])
+
+    def _write_obstacle(self, r, c, is_obstacle):
+        self.obstacles[r * self.n + c] = 1 if is_obstacle else 0
+
+    def obstacle_grid(self):
+        """Trả về view 2D (n x n) của mảng vật cản (không sao chép)."""
+        return self.obstacles.reshape(self.n, self.n)
+
+    def generate_random_map(self, density=0.2, manual_start=None, manual_goal=None, seed=None, rng=None):
+        """
+        Sinh bản đồ với tùy chọn Start/Goal thủ công hoặc ngẫu nhiên (cùng quy tắc với MazeMap).
+        Args:
+            density: Mật độ vật cản.
+            manual_start: Tuple (x, y) hoặc None.
+            manual_goal: Tuple (x, y) hoặc None.
+            seed: Seed để sinh lại đúng bản đồ này (bỏ qua nếu truyền rng).
+            rng: np.random.Generator dùng để sinh.
+        """
+        self.start, self.goal, flat = random_obstacles(self.n, density, manual_start, manual_goal,
+                                                       make_rng(seed, rng))
+        self.obstacles[:] = flat
+
+        self._map_regenerated()
+
+    def save(self, filepath):
+        """
+        Lưu bản đồ ra file nhị phân (định dạng MAP_MAGIC): header 64 byte rồi n*n byte vật cản.
+        Phần dữ liệu được đặt ở offset cố định nên có thể memory-map trực tiếp khi đọc lại.
+        Args:
+            filepath: Đường dẫn file.
+        """
+        fields = np.array([self.n, self.start[0], self.start[1], self.goal[0], self.goal[1],
+                           MAP_FORMAT_VERSION], dtype='<u8')
+        with open(filepath, 'wb') as f:
+            f.write(MAP_MAGIC)
+            f.write(fields.tobytes().ljust(MAP_HEADER_SIZE - len(MAP_MAGIC), b'\0'))
+            f.write(np.ascontiguousarray(self.obstacles, dtype=np.uint8).tobytes())
+
+    @classmethod
+    def load(cls, filepath, mmap_mode='r'):
+        """
+        Đọc bản đồ nhị phân đã lưu bằng save().
+        Args:
+            filepath: Đường dẫn file.
+            mmap_mode: 'r' - memory-map chỉ đọc (nạp tức thì, các tiến trình dùng chung trang bộ nhớ),
+                       'c' - copy-on-write (sửa được, không ghi xuống file),
+                       'r+' - sửa ghi thẳng xuống file,
+                       None - đọc toàn bộ vào RAM.
+        Returns: GridMap.
+        """
+        with open(filepath, 'rb') as f:
+            raw = f.read(MAP_HEADER_SIZE)
+        if len(raw) < MAP_HEADER_SIZE or not raw.startswith(MAP_MAGIC):
+            raise ValueError(f"File khong dung dinh dang ban do: {filepath}")
+        fields = np.frombuffer(raw[len(MAP_MAGIC):len(MAP_MAGIC) + 48], dtype='<u8')
+        n, sr, sc, gr, gc, version = (int(v) for v in fields)
+        if version != MAP_FORMAT_VERSION:
+            raise ValueError(f"Phien ban dinh dang ban do khong ho tro: {version}")
+
+        grid_map = cls.__new__(cls)
+        grid_map.n = n
+        if mmap_mode is None:
+            grid_map.obstacles = np.fromfile(filepath, dtype=np.uint8, count=n * n, offset=MAP_HEADER_SIZE)
         else:
-            # Random nhưng phải khác Start
-            while True:
-                r = random.randint(0, self.n-1)
-                c = random.randint(0, self.n-1)
-                if (r, c) != self.start:
-                    self.goal = (r, c)
-                    break
-        
-        # 3. Random vật cản
-        num_obstacles = int(self.n * self.n * density)
-        count = 0
-        
-        while count < num_obstacles:
-            '''
-            Sinh tọa độ ngẫu nhiên cho vật cản.
-            '''
-            r = random.randint(0, self.n - 1)
-            c = random.randint(0, self.n - 1)
-            
-            # Điều kiện: Không trùng Start, Goal và chưa có vật cản
-            if (r, c) != self.start and (r, c) != self.goal and not self.grid[r][c].is_obstacle:
-                self.grid[r][c].is_obstacle = True
-                count += 1
+            grid_map.obstacles = np.memmap(filepath, dtype=np.uint8, mode=mmap_mode,
+                                           offset=MAP_HEADER_SIZE, shape=(n * n,))
+        grid_map.start = (sr, sc)
+        grid_map.goal = (gr, gc)
+        grid_map._init_events()
+        return grid_map
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        # Bản đồ memory-map: chỉ gửi đường dẫn, tiến trình con tự map lại file thay vì sao chép dữ liệu
+        if isinstance(self.obstacles, np.memmap) and self.obstacles.filename:
+            state['obstacles'] = None
+            state['_mmap_source'] = (self.obstacles.filename, self.obstacles.mode)
+        return state
+
+    def __setstate__(self, state):
+        source = state.pop('_mmap_source', None)
+        self.__dict__.update(state)
+        if source is not None:
+            filename, mode = source
+            self.obstacles = np.memmap(filename, dtype=np.uint8, mode='r' if mode == 'r+' else mode,
+                                       offset=MAP_HEADER_SIZE, shape=(self.n * self.n,))
 
 def visualize_search_history_grid(maze, visited_history, final_path, max_cols=3):
     '''
     Hiển thị quá trình tìm kiếm A* trên lưới mê cung và lưu ảnh.
     Args:
         - maze: MazeMap object.
-        - visited_history: Danh sách các bước đã thăm với thông tin g, h, f.
+        - visited_history: Danh sách (hoặc iterable, ví dụ AStarSolver.iter_solve) các bước đã thăm với thông tin g, h, f.
         - final_path: Danh sách tọa độ của đường đi cuối cùng nếu tìm thấy, else None.
         - max_cols: Số cột tối đa trong lưới hình ảnh.
     '''
+    import matplotlib.pyplot as plt # Nạp khi cần vẽ: các chế độ không vẽ không phụ thuộc matplotlib
+
     n = maze.n
+    if not isinstance(visited_history, list):
+        visited_history = list(visited_history) # Cần biết tổng số bước để chia subplot
     total_steps = len(visited_history)
     
     indices_to_draw = list(range(total_steps))
@@ -125,11 +339,8 @@ def visualize_search_history_grid(maze, visited_history, final_path, max_cols=3)
     else:
         axes_flat = [axes]
 
-    base_data = np.zeros((n, n))
-    for r in range(n):
-        for c in range(n):
-            if maze.grid[r][c].is_obstacle:
-                base_data[r][c] = 1
+    # Dùng chung cho MazeMap và GridMap
+    base_data = obstacle_array(maze).reshape(n, n).astype(float)
     
     cmap = plt.cm.colors.ListedColormap(['white', 'black', 'green', 'red', 'lightgray', 'gold'])
     bounds = [-0.5, 0.5, 1.5, 2.5, 3.5, 4.5, 5.5]
@@ -191,6 +402,17 @@ def visualize_search_history_grid(maze, visited_history, final_path, max_cols=3)
     plt.tight_layout()
     
     # --- LƯU ẢNH ---
+    output_filename = _image_path("astar_result.png")
+    
+    plt.savefig(output_filename)
+    print(f"\nĐã lưu ảnh kết quả vào file: {output_filename}")
+    
+    plt.show()
+
+def _image_path(filename):
+    """
+    Đường dẫn lưu ảnh trong thư mục images/ của module (tạo thư mục nếu chưa có).
+    """
     current_dir = os.path.dirname(os.path.abspath(__file__))
     save_dir = os.path.join(current_dir, "images")
 
@@ -198,12 +420,127 @@ def visualize_search_history_grid(maze, visited_history, final_path, max_cols=3)
         os.makedirs(save_dir)
         print(f"Đã tạo thư mục mới: {save_dir}")
 
-    output_filename = os.path.join(save_dir, "astar_result.png")
-    
+    return os.path.join(save_dir, filename)
+
+def visualize_search_heatmap(maze, events, final_path, filename="astar_heatmap.png", show=True):
+    '''
+    Vẽ một ảnh duy nhất: màu của mỗi ô là thứ tự được duyệt (heatmap), kèm đường đi cuối cùng.
+    Đọc luồng sự kiện một lượt và không giữ lại lịch sử, nên chi phí tuyến tính theo số bước.
+    Args:
+        - maze: MazeMap hoặc GridMap.
+        - events: Iterable các bước duyệt (visited_history hoặc AStarSolver.iter_solve()).
+        - final_path: Danh sách tọa độ của đường đi cuối cùng nếu tìm thấy, else None.
+        - filename: Tên file ảnh lưu trong images/.
+        - show: Gọi plt.show() sau khi lưu.
+    '''
+    import matplotlib.pyplot as plt
+
+    n = maze.n
+    order = np.full(n * n, np.nan)
+    total_steps = 0
+    for total_steps, item in enumerate(events, 1):
+        r, c = item['pos']
+        if np.isnan(order[r * n + c]): # Tìm kiếm hai chiều có thể duyệt một ô hai lần
+            order[r * n + c] = total_steps
+
+    fig, ax = plt.subplots(figsize=(8, 8))
+    obstacles = obstacle_array(maze).reshape(n, n)
+    ax.imshow(obstacles, cmap=plt.cm.colors.ListedColormap(['white', 'black']),
+              vmin=0, vmax=1, interpolation='nearest')
+    heat = ax.imshow(np.ma.masked_invalid(order.reshape(n, n)), cmap='viridis', interpolation='nearest')
+    fig.colorbar(heat, ax=ax, fraction=0.046, pad=0.04, label="Thu tu duyet")
+
+    if final_path:
+        rows, cols = zip(*final_path)
+        ax.plot(cols, rows, color='red', linewidth=1.5)
+    ax.scatter([maze.start[1]], [maze.start[0]], c='lime', s=60, marker='o', edgecolors='black', zorder=3)
+    ax.scatter([maze.goal[1]], [maze.goal[0]], c='red', s=60, marker='X', edgecolors='black', zorder=3)
+
+    ax.set_title(f"HEATMAP THU TU DUYET ({total_steps} buoc)", fontsize=12, fontweight='bold')
+    ax.set_xticks([]); ax.set_yticks([])
+    plt.tight_layout()
+
+    output_filename = _image_path(filename)
     plt.savefig(output_filename)
     print(f"\nĐã lưu ảnh kết quả vào file: {output_filename}")
-    
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
+
+def animate_search_history(maze, events, final_path, max_frames=200, interval=50,
+                           filename="astar_animation.gif", show=False):
+    '''
+    Xuất ảnh động (GIF, hoặc MP4 nếu có ffmpeg) quá trình tìm kiếm.
+    Các bước được lấy mẫu thành tối đa max_frames khung hình; mỗi khung chỉ tô thêm các ô mới
+    kể từ khung trước và dùng blitting, nên tổng chi phí tuyến tính theo số bước.
+    Args:
+        - maze: MazeMap hoặc GridMap.
+        - events: Iterable các bước duyệt (visited_history hoặc AStarSolver.iter_solve()).
+        - final_path: Danh sách tọa độ của đường đi cuối cùng nếu tìm thấy, else None.
+        - max_frames: Số khung hình tối đa.
+        - interval: Thời gian giữa hai khung (ms).
+        - filename: Tên file lưu trong images/ (.gif hoặc .mp4).
+        - show: Hiển thị cửa sổ animation sau khi lưu.
+    '''
+    import matplotlib.pyplot as plt
+    from matplotlib import animation
+
+    n = maze.n
+    # Chỉ giữ chỉ số ô (mảng int) thay vì dict của từng bước
+    visited = np.fromiter((item['pos'][0] * n + item['pos'][1] for item in events), dtype=np.int64)
+    total_steps = len(visited)
+    if total_steps == 0: # Truy vấn bị loại trước khi duyệt (ví dụ khác thành phần liên thông)
+        print("\nKhong co buoc duyet nao, bo qua animation.")
+        return
+    frames = np.unique(np.linspace(0, total_steps, num=min(max_frames, total_steps) + 1).astype(int))
+
+    base_data = obstacle_array(maze).reshape(n, n).astype(float)
+    data = base_data.copy()
+    endpoints = [(maze.start, 2), (maze.goal, 3)]
+
+    cmap = plt.cm.colors.ListedColormap(['white', 'black', 'green', 'red', 'lightgray', 'gold'])
+    norm = plt.cm.colors.BoundaryNorm([-0.5, 0.5, 1.5, 2.5, 3.5, 4.5, 5.5], cmap.N)
+    fig, ax = plt.subplots(figsize=(6, 6))
+    image = ax.imshow(data, cmap=cmap, norm=norm, interpolation='nearest', animated=True)
+    label = ax.text(0.02, 0.98, "", transform=ax.transAxes, va='top', fontsize=10,
+                    fontweight='bold', color='blue', animated=True)
+    ax.set_xticks([]); ax.set_yticks([])
+
+    def init():
+        data[:] = base_data
+        for (r, c), value in endpoints:
+            data[r][c] = value
+        image.set_data(data)
+        label.set_text("")
+        return image, label
+
+    def update(k):
+        flat = data.reshape(-1)
+        flat[visited[frames[k - 1]:frames[k]]] = 4
+        if k == len(frames) - 1 and final_path:
+            for r, c in final_path:
+                data[r][c] = 5
+        for (r, c), value in endpoints:
+            data[r][c] = value
+        image.set_data(data)
+        label.set_text(f"Buoc {frames[k]}/{total_steps}")
+        return image, label
+
+    anim = animation.FuncAnimation(fig, update, frames=range(1, len(frames)), init_func=init,
+                                   blit=True, interval=interval, repeat=False)
+    output_filename = _image_path(filename)
+    if output_filename.endswith('.mp4') and animation.writers.is_available('ffmpeg'):
+        writer = 'ffmpeg'
+    else:
+        writer = 'pillow'
+        output_filename = os.path.splitext(output_filename)[0] + '.gif'
+    anim.save(output_filename, writer=writer, fps=max(1, 1000 // interval))
+    print(f"\nĐã lưu animation vào file: {output_filename}")
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
 
 def get_coordinate_input(prompt, limit_n):
     """
@@ -239,13 +576,22 @@ class AStarController:
     """
     Lớp điều khiển chính để chạy A*.
     """
+    # N <= VISUAL_MAX_N: dùng MazeMap (lưới Node), in log từng bước và vẽ ảnh.
+    # N lớn hơn: dùng GridMap + chế độ 'array', chỉ in kết quả.
+    VISUAL_MAX_N = 20
+    MAX_N = 4000
+    # Vẽ từng bước (một subplot mỗi bước) khi số bước không quá mức này, ngược lại vẽ heatmap
+    GRID_MAX_STEPS = 60
+    # Lưới lớn đến mức này vẫn vẽ heatmap (đọc trực tiếp luồng iter_solve)
+    HEATMAP_MAX_N = 2000
+
     def run(self):
         print("=== CAU HINH INPUT A* ===")
         
         try:
             val_n = input("1. Nhap kich thuoc N (Mac dinh 10): ")
             n = 10 if not val_n.strip() else int(val_n)
-            if n > 20: n = 20
+            if n > self.MAX_N: n = self.MAX_N
             if n < 5: n = 5
             
             val_d = input("2. Nhap mat do vat can (Mac dinh 0.2): ")
@@ -263,7 +609,8 @@ class AStarController:
             n = 10; density = 0.2; start_in = None; goal_in = None
 
         print("\nDang khoi tao ban do...")
-        maze = MazeMap(n)
+        large = n > self.VISUAL_MAX_N
+        maze = GridMap(n) if large else MazeMap(n)
         
         # GỌI HÀM SINH MAP VỚI THAM SỐ START/GOAL
         maze.generate_random_map(density, manual_start=start_in, manual_goal=goal_in)
@@ -278,23 +625,54 @@ class AStarController:
         print("-" * 40)
         
         print("Dang chay thuat toan A*...")
-        solver = AStarSolver(maze)
-        path, history = solver.solve()
-        
-        # --- IN LOG ---
+
+        if large:
+            solver = AStarSolver(maze, trace=TRACE_COUNTERS)
+            draw = n <= self.HEATMAP_MAX_N
+            if draw:
+                # Một lượt iter_solve duy nhất: giữ thứ tự duyệt dạng mảng chỉ số ô (8 byte/bước),
+                # đường đi và thống kê lấy từ chính lượt này thay vì tìm lại lần hai
+                visited = np.fromiter((item['pos'][0] * n + item['pos'][1] for item in solver.iter_solve()),
+                                      dtype=np.int64)
+                path = solver.last_path
+            else:
+                path, _ = solver.solve()
+            print(f"-> So o da duyet: {solver.stats['expanded']} ({solver.stats['time']:.3f}s)")
+            if path:
+                print(f"-> Da tim thay duong di! Do dai: {len(path)-1} buoc.")
+            else:
+                print("-> KHONG tim thay duong di!")
+            if draw:
+                print(f"(N > {self.VISUAL_MAX_N}: bo qua log tung buoc, ve heatmap thu tu duyet)")
+                events = ({'pos': divmod(int(idx), n)} for idx in visited)
+                visualize_search_heatmap(maze, events, path)
+            else:
+                print(f"(N > {self.HEATMAP_MAX_N}: bo qua log tung buoc va hinh anh)")
+            return
+
+        solver = AStarSolver(maze, trace=TRACE_FULL)
+
+        # --- IN LOG (đọc trực tiếp từ luồng sự kiện của iter_solve) ---
         print("\n" + "="*50)
         print(f"{'BUOC':<6} | {'TOA DO (H,C)':<12} | {'G':<4} | {'H':<4} | {'F (G+H)':<8}")
         print("-" * 50)
-        
-        for i, item in enumerate(history):
+
+        history = []
+        for i, item in enumerate(solver.iter_solve()):
             pos_str = str(item['pos'])
             print(f"{i+1:<6} | {pos_str:<12} | {int(item['g']):<4} | {int(item['h']):<4} | {int(item['f']):<8}")
+            history.append(item) # Giữ lại cho phần vẽ hình
         print("="*50 + "\n")
+        path = solver.last_path
 
         if path:
             print(f"-> Da tim thay duong di! Do dai: {len(path)-1} buoc.")
         else:
             print("-> KHONG tim thay duong di!")
             
-        print("-> Dang ve chi tiet tung buoc xu ly...")
-        visualize_search_history_grid(maze, history, path, max_cols=3)
\ No newline at end of file
+        if len(history) <= self.GRID_MAX_STEPS:
+            print("-> Dang ve chi tiet tung buoc xu ly...")
+            visualize_search_history_grid(maze, history, path, max_cols=3)
+        else:
+            print(f"-> So buoc duyet lon ({len(history)}), ve heatmap thu tu duyet...")
+            visualize_search_heatmap(maze, history, path)
\ No newline at end of file
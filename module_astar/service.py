@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from cores import (AStarSolver, JPSSolver, BidirectionalAStarSolver, TRACE_COUNTERS,
+                   _init_worker, _worker_query)
+from helpers import GridMap
+
+SOLVERS = {
+    'astar': AStarSolver,
+    'jps': JPSSolver,
+    'bidirectional': BidirectionalAStarSolver,
+}
+
+class QueryService:
+    """
+    Dịch vụ trả lời truy vấn đường đi không tương tác (không input(), không vẽ, không cần matplotlib).
+    Bản đồ được nạp một lần; các truy vấn được giải đồng thời bởi một pool worker dùng chung:
+        - 'process': mỗi tiến trình nhận solver một lần qua initializer (GridMap nạp bằng mmap
+          chỉ được map lại, không sao chép).
+        - 'thread': các luồng dùng chung solver trong bộ nhớ (SearchState riêng từng luồng).
+    Giao thức: mỗi dòng một JSON.
+        Yêu cầu:  {"id": 1, "start": [r, c], "goal": [r, c]}   hoặc   {"id": 2, "op": "stats"}
+        Trả lời:  {"id": 1, "path": [[r, c], ...] | null, "path_length": ..., "expanded": ..., "time": ...}
+                  {"id": 1, "error": "..."} nếu yêu cầu không hợp lệ.
+    Câu trả lời được ghi ngay khi có (có thể khác thứ tự gửi), ghép với yêu cầu qua "id".
+    """
+    def __init__(self, solver, workers=None, executor='process', max_pending=None):
+        """
+        Args:
+            solver: Solver đã gắn bản đồ (AStarSolver hoặc lớp con).
+            workers: Số worker, mặc định os.cpu_count().
+            executor: 'process' hoặc 'thread'.
+            max_pending: Số truy vấn tối đa đang chờ trong pool (giới hạn bộ nhớ khi input nhanh hơn worker).
+        """
+        self.solver = solver
+        self.map = solver.map
+        self.workers = workers or os.cpu_count() or 1
+        if executor == 'process':
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(solver,))
+        elif executor == 'thread':
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        else:
+            raise ValueError(f"executor khong hop le: {executor}")
+        self.executor = executor
+        self.max_pending = max_pending or self.workers * 4
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self.answered = 0
+        self.errors = 0
+
+    def close(self):
+        """Dừng pool worker (chờ các truy vấn đang chạy)."""
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def handle_line(self, line, reply):
+        """
+        Xử lý một dòng yêu cầu; reply(dict) được gọi (có thể từ luồng khác) khi có câu trả lời.
+        Args:
+            line: Chuỗi JSON một dòng.
+            reply: Hàm nhận dict câu trả lời.
+        """
+        req_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("yeu cau phai la JSON object")
+            req_id = request.get('id')
+            if request.get('op', 'query') == 'stats':
+                reply(self._stats_reply(req_id))
+                return
+            start, goal = self._endpoints(request)
+        except (ValueError, TypeError) as e:
+            self._count(error=True)
+            reply({'id': req_id, 'error': str(e)})
+            return
+
+        self._slots.acquire()
+        try:
+            if self.executor == 'process':
+                future = self._pool.submit(_worker_query, (start, goal))
+            else:
+                future = self._pool.submit(self.solver.query, start, goal)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._finish(f, req_id, reply))
+
+    def serve_stream(self, infile, outfile):
+        """
+        Đọc yêu cầu từ infile (ví dụ stdin) đến hết, ghi câu trả lời vào outfile (JSON lines).
+        Trả về sau khi mọi câu trả lời đã được ghi.
+        """
+        write_lock = threading.Lock()
+
+        def reply(message):
+            data = json.dumps(message, separators=(',', ':'))
+            with write_lock:
+                outfile.write(data + '\n')
+                outfile.flush()
+
+        for line in infile:
+            if line.strip():
+                self.handle_line(line, reply)
+        self._drain()
+
+    def serve_socket(self, address):
+        """
+        Phục vụ qua socket cục bộ: address là (host, port) cho TCP hoặc đường dẫn file cho Unix socket.
+        Mỗi kết nối dùng chung pool worker; chạy đến khi bị ngắt (Ctrl+C).
+        """
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                write_lock = threading.Lock()
+                pending = threading.Semaphore(0)
+                sent = 0
+
+                def reply(message):
+                    data = (json.dumps(message, separators=(',', ':')) + '\n').encode()
+                    with write_lock:
+                        try:
+                            self.wfile.write(data)
+                            self.wfile.flush()
+                        except OSError:
+                            pass # Client đã đóng kết nối
+                    pending.release()
+
+                for raw in self.rfile:
+                    line = raw.decode('utf-8', errors='replace')
+                    if line.strip():
+                        sent += 1
+                        service.handle_line(line, reply)
+                for _ in range(sent): # Chờ trả lời hết trước khi đóng kết nối
+                    pending.acquire()
+
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+            server_cls = socketserver.ThreadingUnixStreamServer
+        else:
+            server_cls = socketserver.ThreadingTCPServer
+        server_cls.daemon_threads = True
+        with server_cls(address, Handler) as server:
+            print(f"Dang phuc vu tai {address} ({self.workers} worker, {self.executor})", file=sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+    def _endpoints(self, request):
+        n = self.map.n
+        points = []
+        for name in ('start', 'goal'):
+            value = request.get(name)
+            if value is None:
+                value = getattr(self.map, name)
+            r, c = (int(v) for v in value)
+            if not (0 <= r < n and 0 <= c < n):
+                raise ValueError(f"{name} ngoai ban do: {[r, c]}")
+            if self.map.is_obstacle(r, c):
+                raise ValueError(f"{name} la vat can: {[r, c]}")
+            points.append((r, c))
+        return points[0], points[1]
+
+    def _finish(self, future, req_id, reply):
+        try:
+            path, stats = future.result()
+        except Exception as e:
+            self._count(error=True)
+            reply({'id': req_id, 'error': f"{type(e).__name__}: {e}"})
+        else:
+            self._count()
+            reply({
+                'id': req_id,
+                'path': [list(p) for p in path] if path else None,
+                'path_length': stats['path_length'],
+                'expanded': stats['expanded'],
+                'time': stats['time'],
+            })
+        finally:
+            self._slots.release() # Nhả chỗ sau khi đã trả lời: _drain chờ cả việc ghi kết quả
+
+    def _count(self, error=False):
+        with self._lock:
+            if error:
+                self.errors += 1
+            else:
+                self.answered += 1
+
+    def _stats_reply(self, req_id):
+        return {
+            'id': req_id,
+            'n': self.map.n,
+            'workers': self.workers,
+            'executor': self.executor,
+            'answered': self.answered,
+            'errors': self.errors,
+        }
+
+    def _drain(self):
+        """Chờ đến khi không còn truy vấn nào trong pool."""
+        for _ in range(self.max_pending):
+            self._slots.acquire()
+        for _ in range(self.max_pending):
+            self._slots.release()
+
+def build_map(args):
+    """Nạp bản đồ từ file (mmap) hoặc sinh ngẫu nhiên theo --size/--density/--seed."""
+    if args.map:
+        return GridMap.load(args.map)
+    maze = GridMap(args.size)
+    maze.generate_random_map(args.density, seed=args.seed)
+    return maze
+
+def parse_address(text):
+    """'host:port' hoặc ':port' -> (host, port) cho TCP; chuỗi khác được coi là đường dẫn Unix socket."""
+    host, sep, port = text.rpartition(':')
+    if sep and port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return text
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dich vu tim duong A* khong tuong tac (JSON lines)")
+    parser.add_argument('--map', help="File ban do GridMap.save (nap bang mmap)")
+    parser.add_argument('--size', type=int, default=1000, help="Kich thuoc ban do ngau nhien khi khong co --map")
+    parser.add_argument('--density', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--solver', choices=sorted(SOLVERS), default='astar')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--executor', choices=('process', 'thread'), default='process')
+    parser.add_argument('--socket', help="Phuc vu qua socket: 'host:port' (TCP) hoac duong dan (Unix socket)."
+                                         " Mac dinh doc stdin, ghi stdout")
+    args = parser.parse_args(argv)
+
+    maze = build_map(args)
+    solver = SOLVERS[args.solver](maze, trace=TRACE_COUNTERS)
+    with QueryService(solver, workers=args.workers, executor=args.executor) as service:
+        if args.socket:
+            service.serve_socket(parse_address(args.socket))
+        else:
+            service.serve_stream(sys.stdin, sys.stdout)
+
+if __name__ == "__main__":
+    main()
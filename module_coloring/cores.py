@@ -1,25 +1,356 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory # Python 3.8+
+except ImportError:
+    shared_memory = None
+
+class ColoringHistory:
+    """
+    Lịch sử tô màu dạng nhật ký thay đổi (delta log): bước i chỉ lưu cặp (nodes[i], colors[i])
+    trong hai mảng int32, bộ nhớ O(N) thay vì một bản sao dict cho mỗi bước (O(N^2)).
+    Trạng thái tại một bước được dựng lại khi cần (state_at / history[i]).
+    """
+    def __init__(self, n):
+        self.nodes = np.empty(n, dtype=np.int32)
+        self.colors = np.empty(n, dtype=np.int32)
+        self._size = 0
+
+    def append(self, node, color):
+        """Ghi bước mới: đỉnh node được tô màu color."""
+        if self._size == len(self.nodes): # Một đỉnh có thể được tô lại: nới mảng khi đầy
+            self.nodes = np.resize(self.nodes, max(1, 2 * self._size))
+            self.colors = np.resize(self.colors, max(1, 2 * self._size))
+        self.nodes[self._size] = node
+        self.colors[self._size] = color
+        self._size += 1
+
+    def __len__(self):
+        return self._size
+
+    def step(self, i):
+        """
+        Returns: (node, color) của bước i (hỗ trợ chỉ số âm).
+        """
+        i = self._index(i)
+        return int(self.nodes[i]), int(self.colors[i])
+
+    def steps(self):
+        """Duyệt lần lượt các bước (node, color)."""
+        return zip(self.nodes[:self._size].tolist(), self.colors[:self._size].tolist())
+
+    def state_at(self, i):
+        """
+        Dựng lại trạng thái sau bước i (hỗ trợ chỉ số âm).
+        Returns: dict {node: color} theo thứ tự tô (giống bản chụp result_colors cũ).
+        """
+        i = self._index(i)
+        return dict(zip(self.nodes[:i + 1].tolist(), self.colors[:i + 1].tolist()))
+
+    def colors_at(self, i, n):
+        """
+        Trạng thái sau bước i dạng mảng (vector hóa).
+        Returns: np.ndarray int32 độ dài n, -1 cho đỉnh chưa tô.
+        """
+        i = self._index(i)
+        state = np.full(n, -1, dtype=np.int32)
+        state[self.nodes[:i + 1]] = self.colors[:i + 1] # Ghi theo thứ tự: bước sau đè bước trước
+        return state
+
+    def extend(self, nodes, colors):
+        """Ghi nhiều bước một lúc (mảng node, mảng color cùng độ dài)."""
+        count = len(nodes)
+        if self._size + count > len(self.nodes):
+            capacity = max(self._size + count, 2 * self._size)
+            self.nodes = np.resize(self.nodes, capacity)
+            self.colors = np.resize(self.colors, capacity)
+        self.nodes[self._size:self._size + count] = nodes
+        self.colors[self._size:self._size + count] = colors
+        self._size += count
+
+    def clear(self):
+        """Xóa toàn bộ các bước (giữ bộ nhớ đã cấp phát)."""
+        self._size = 0
+
+    def __getitem__(self, i):
+        return self.state_at(i)
+
+    def _index(self, i):
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError(f"Buoc {i} ngoai lich su ({self._size} buoc)")
+        return i
+
+class SaturationBuckets:
+    """
+    Hàng đợi ưu tiên cho DSATUR: lấy đỉnh có độ bão hòa lớn nhất, hòa thì bậc lớn nhất.
+    Bucket 2 tầng: level[sat] -> {hạng bậc -> {node: None}}, hạng bậc là chỉ số của bậc trong
+    danh sách các bậc phân biệt (không quá ~sqrt(2m) giá trị).
+    Tăng độ bão hòa của một đỉnh là O(1) (chuyển sang bucket kế tiếp); con trỏ max_sat và
+    top[sat] được cập nhật lười khi pop, nên không phải quét lại toàn bộ các đỉnh.
+    """
+    def __init__(self, ranks):
+        """
+        Args:
+            ranks: list hạng bậc của từng đỉnh (bậc càng lớn hạng càng cao).
+        """
+        self._rank = ranks
+        self._sat = [0] * len(ranks)
+        self._levels = [{}]  # sat -> {rank -> {node: None}}
+        self._counts = [0]   # Số đỉnh trong từng level
+        self._top = [-1]     # Cận trên hạng bậc còn đỉnh trong từng level
+        self._max_sat = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def push(self, node):
+        """Thêm đỉnh với độ bão hòa 0."""
+        self._insert(node, 0)
+        self._size += 1
+
+    def increase(self, node):
+        """Tăng độ bão hòa của đỉnh (đang trong hàng đợi) thêm 1."""
+        sat = self._sat[node]
+        rank = self._rank[node]
+        level = self._levels[sat]
+        bucket = level[rank]
+        del bucket[node]
+        if not bucket:
+            del level[rank]
+        self._counts[sat] -= 1
+        self._insert(node, sat + 1)
+
+    def pop(self):
+        """
+        Returns: đỉnh có (độ bão hòa, bậc) lớn nhất, đã bị lấy khỏi hàng đợi.
+        """
+        counts = self._counts
+        sat = self._max_sat
+        while counts[sat] == 0:
+            sat -= 1
+        self._max_sat = sat
+        level = self._levels[sat]
+        rank = self._top[sat]
+        while rank not in level:
+            rank -= 1
+        self._top[sat] = rank
+        bucket = level[rank]
+        node, _ = bucket.popitem() # popitem O(1); hòa hoàn toàn thì lấy đỉnh vào sau cùng
+        if not bucket:
+            del level[rank]
+        counts[sat] -= 1
+        self._size -= 1
+        return node
+
+    def _insert(self, node, sat):
+        if sat == len(self._levels):
+            self._levels.append({})
+            self._counts.append(0)
+            self._top.append(-1)
+        rank = self._rank[node]
+        level = self._levels[sat]
+        bucket = level.get(rank)
+        if bucket is None:
+            bucket = level[rank] = {}
+        bucket[node] = None
+        self._counts[sat] += 1
+        if rank > self._top[sat]:
+            self._top[sat] = rank
+        if sat > self._max_sat:
+            self._max_sat = sat
+        self._sat[node] = sat
+
+def _csr_rows(indptr, indices, vertices):
+    """
+    Cạnh CSR của một tập đỉnh (vector hóa, không vòng lặp Python).
+    Returns: (vị trí đỉnh nguồn trong vertices, đỉnh đích) cho từng cạnh.
+    """
+    starts = indptr[vertices]
+    lengths = indptr[vertices + 1] - starts
+    offsets = np.cumsum(lengths) - lengths
+    edge = np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+    return np.repeat(np.arange(vertices.size), lengths), indices[edge]
+
+def _jp_count(indptr, indices, priority, lo, hi):
+    """
+    Số hàng xóm có độ ưu tiên cao hơn của từng đỉnh trong khối [lo, hi) (số đỉnh phải tô trước nó).
+    """
+    lengths = np.diff(indptr[lo:hi + 1])
+    src = np.repeat(np.arange(lo, hi), lengths)
+    dst = indices[indptr[lo]:indptr[hi]]
+    higher = priority[dst] > priority[src]
+    return np.bincount(src[higher] - lo, minlength=hi - lo)
+
+def _jp_color(indptr, indices, priority, colors, ready):
+    """
+    Tô một phần của vòng Jones-Plassmann. Mọi hàng xóm ưu tiên cao hơn của các đỉnh trong ready
+    đã được tô ở các vòng trước, còn hai đỉnh ready không kề nhau (tập độc lập), nên mỗi đỉnh
+    nhận màu nhỏ nhất chưa có ở hàng xóm đã tô. Chỉ đọc mảng dùng chung.
+    Returns: (màu của các đỉnh ready, các đỉnh hàng xóm ưu tiên thấp hơn - mỗi lần xuất hiện
+              là một đỉnh đi trước của nó vừa được tô).
+    """
+    owner, dst = _csr_rows(indptr, indices, ready)
+    lower = priority[dst] < priority[ready][owner]
+    used = colors[dst[~lower]].astype(np.int64)
+    owner = owner[~lower]
+
+    # --- MÀU NHỎ NHẤT CHƯA DÙNG (mex) ---
+    span = int(used.max()) + 2 if used.size else 1
+    key = owner * span + used
+    key.sort()
+    if key.size:
+        keep = np.empty(key.size, dtype=bool)
+        keep[0] = True
+        np.not_equal(key[1:], key[:-1], out=keep[1:]) # Bỏ cặp (đỉnh, màu) trùng
+        key = key[keep]
+    owner, used = np.divmod(key, span)
+    position = np.arange(key.size)
+    first = np.empty(key.size, dtype=bool)
+    if key.size:
+        first[0] = True
+        np.not_equal(owner[1:], owner[:-1], out=first[1:])
+    group_start = np.maximum.accumulate(np.where(first, position, 0))
+    # Màu đã sắp xếp trong nhóm: các màu 0, 1, ..., r-1 liên tiếp ở đầu nhóm thì mex = r
+    prefix = used == position - group_start
+    mex = np.bincount(owner[prefix], minlength=ready.size)
+    return mex.astype(np.int32), dst[lower]
+
+_JP_ARRAYS = None
+_JP_SHARED = []
+
+def _init_jp_worker(spec):
+    """Gắn các mảng dùng chung (shared memory) một lần cho mỗi tiến trình worker."""
+    global _JP_ARRAYS
+    arrays = []
+    for name, shape, dtype in spec:
+        shm = shared_memory.SharedMemory(name=name)
+        _JP_SHARED.append(shm) # Giữ tham chiếu để vùng nhớ không bị đóng
+        arrays.append(np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+    _JP_ARRAYS = arrays
+
+def _jp_worker_count(block):
+    indptr, indices, priority, _ = _JP_ARRAYS
+    return _jp_count(indptr, indices, priority, block[0], block[1])
+
+def _jp_worker_color(ready):
+    return _jp_color(*_JP_ARRAYS, ready)
+
+# Số bit 1 của một bitset int: int.bit_count chỉ có từ Python 3.10
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:
+    def _popcount(bits):
+        return bin(bits).count('1')
+
+def _greedy_colors(adj_list, order, n):
+    """
+    Tô tham lam theo thứ tự cho trước, mỗi đỉnh O(bậc): đánh dấu màu hàng xóm bằng "tem" là chính
+    đỉnh đang xét, không cần tạo set mới cho từng đỉnh.
+    Returns: list màu của từng đỉnh.
+    """
+    colors = [-1] * n
+    mark = [-1] * (n + 1)
+    for node in order:
+        for neighbor in adj_list[node]:
+            c = colors[neighbor]
+            if c >= 0:
+                mark[c] = node
+        c = 0
+        while mark[c] == node:
+            c += 1
+        colors[node] = c
+    return colors
+
 class OptimalColoringSolver:
     """
     Thực thi thuật toán tô màu tối ưu trên đồ thị.
-    Chiến lược: Ưu tiên tô màu các đỉnh có bậc cao nhất trước (High Degree First).
+    Chiến lược:
+        - 'degree': Ưu tiên tô màu các đỉnh có bậc cao nhất trước (High Degree First), thứ tự cố định.
+        - 'dsatur': Mỗi bước chọn đỉnh có nhiều màu khác nhau ở hàng xóm nhất (độ bão hòa),
+                    hòa thì bậc cao nhất (Brélaz). Thường cần ít màu hơn.
+        - 'exact':  Nhánh cận (branch-and-bound) theo thứ tự DSATUR, cận dưới từ clique, giới hạn
+                    thời gian time_limit. Sau solve: lower_bound (cận dưới đã chứng minh),
+                    is_optimal (True nếu số màu của result_colors bằng cận dưới / đã duyệt hết).
+        - 'parallel': Jones-Plassmann với độ ưu tiên ngẫu nhiên: mỗi vòng tô đồng thời một tập
+                    độc lập, vector hóa NumPy trên mảng CSR, chia khối đỉnh cho `workers` tiến trình.
+                    Dùng cho đồ thị rất lớn; số màu thường nhiều hơn DSATUR.
+        - 'smallest_last': Thứ tự smallest-last (degeneracy, Matula-Beck) dựng bằng bucket queue
+                    trong O(V+E), rồi tô tham lam; số màu không quá degeneracy + 1.
+    Với improve_time > 0, mọi chế độ trừ 'exact' chạy thêm pha tìm kiếm cục bộ Iterated Greedy
+    (Culberson) trong improve_time giây; improvement_log ghi (thời điểm, số màu) mỗi khi giảm màu.
     """
-    def __init__(self, graph_map):
+    STRATEGIES = ('degree', 'dsatur', 'exact', 'parallel', 'smallest_last')
+    EXACT_MAX_N = 5000 # Bitset kề tốn n^2/8 byte
+
+    def __init__(self, graph_map, strategy='degree', time_limit=10.0, workers=None, seed=None,
+                 improve_time=0):
+        """
+        Args:
+            graph_map: GraphMap hoặc CSRGraph.
+            strategy: 'degree', 'dsatur', 'exact', 'parallel' hoặc 'smallest_last'.
+            time_limit: Ngân sách thời gian (giây) cho chế độ 'exact'.
+            workers: Số tiến trình cho chế độ 'parallel' (mặc định os.cpu_count(), 1 = chạy tại chỗ).
+            seed: Seed ngẫu nhiên (None = khác nhau mỗi lần chạy): độ ưu tiên đỉnh của chế độ
+                  'parallel' và cách chọn thứ tự lớp màu ở pha cải thiện.
+            improve_time: Số giây cho pha cải thiện Iterated Greedy sau khi tô (0 = bỏ qua).
+                          Áp dụng cho mọi chế độ trừ 'exact'; kết quả ghi ở improvement_log.
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"strategy khong hop le: {strategy} (chon trong {self.STRATEGIES})")
         self.graph = graph_map
+        self.strategy = strategy
+        self.time_limit = time_limit
+        self.workers = workers
+        self.seed = seed
         self.result_colors = {}
+        self.color_array = None # Mảng màu (chế độ 'parallel')
+        self.rounds = 0
+        self.improve_time = improve_time
+        self.improvement_log = [] # [(giây kể từ đầu pha cải thiện, số màu)]
+        self.lower_bound = None
+        self.is_optimal = None
+        self.search_nodes = 0
 
-    def solve(self):
+    def solve(self, record_history=True):
         """
-        Chạy thuật toán tô màu.
-        Returns: history (list of dicts) - Lịch sử các bước tô màu.
+        Chạy thuật toán tô màu. Kết quả cuối cùng nằm ở self.result_colors.
+        Args:
+            record_history (bool): Ghi lịch sử từng bước (False để tắt hẳn với đồ thị lớn).
+        Returns: history (ColoringHistory) - Lịch sử các bước tô màu, hoặc None nếu tắt.
         """
-        history = []
+        history = ColoringHistory(self.graph.n) if record_history else None
         self.result_colors = {}
 
+        if self.strategy == 'parallel':
+            self._solve_parallel(history)
+            return self._improve(history)
+
+        # Danh sách kề: CSRGraph đọc thẳng từ mảng CSR, GraphMap dùng dict adj_list
+        adj_list = self._adjacency()
+
+        if self.strategy == 'dsatur':
+            self._solve_dsatur(adj_list, history)
+            return self._improve(history, adj_list)
+        if self.strategy == 'exact':
+            self._solve_exact(adj_list, history)
+            return history
+        if self.strategy == 'smallest_last':
+            self._solve_smallest_last(adj_list, history)
+            return self._improve(history, adj_list)
+
         # --- BƯỚC 1: TÍNH BẬC CỦA CÁC ĐỈNH ---
         # Tạo danh sách (node_id, degree)
         nodes_degree = []
         for i in range(self.graph.n):
-            degree = len(self.graph.adj_list[i])
+            degree = len(adj_list[i])
             nodes_degree.append((i, degree))
 
         # --- BƯỚC 2: SẮP XẾP ĐỈNH THEO BẬC GIẢM DẦN ---
@@ -29,14 +360,17 @@ class OptimalColoringSolver:
         # Lấy ra danh sách các đỉnh đã sắp xếp
         sorted_nodes = [item[0] for item in nodes_degree]
 
-        # In ra thứ tự ưu tiên tô màu
-        print(f"Thu tu uu tien to mau (bac giam dan): {sorted_nodes}")
+        # In ra thứ tự ưu tiên tô màu (rút gọn với đồ thị lớn)
+        if len(sorted_nodes) <= 50:
+            print(f"Thu tu uu tien to mau (bac giam dan): {sorted_nodes}")
+        else:
+            print(f"Thu tu uu tien to mau (bac giam dan): {sorted_nodes[:50]} ... ({len(sorted_nodes)} dinh)")
 
         # --- BƯỚC 3: TIẾN HÀNH TÔ MÀU (GREEDY) ---
         for node in sorted_nodes:
             # 1. Tìm tập hợp màu của các hàng xóm đã được tô trước đó
             neighbor_colors = set()
-            for neighbor in self.graph.adj_list[node]:
+            for neighbor in adj_list[node]:
                 if neighbor in self.result_colors:
                     neighbor_colors.add(self.result_colors[neighbor])
 
@@ -49,7 +383,445 @@ class OptimalColoringSolver:
             # 3. Gán màu cho đỉnh hiện tại
             self.result_colors[node] = color_id
 
-            # 4. Lưu lại trạng thái vào lịch sử
-            history.append(self.result_colors.copy())
+            # 4. Lưu lại thay đổi vào lịch sử
+            if history is not None:
+                history.append(node, color_id)
+
+        return self._improve(history, adj_list)
+
+    def _solve_smallest_last(self, adj_list, history):
+        """
+        Thứ tự smallest-last: lặp lại việc gỡ đỉnh có bậc (trong phần còn lại) nhỏ nhất, tô theo
+        thứ tự ngược lại. Bucket queue dạng mảng (Batagelj-Zaversnik): vert xếp các đỉnh theo bậc
+        hiện tại, start[d] là đầu bucket bậc d; giảm bậc một đỉnh = đổi chỗ nó với đầu bucket
+        rồi dời ranh giới, O(1). Tổng chi phí O(V+E).
+        """
+        n = self.graph.n
+        degree = [len(adj_list[u]) for u in range(n)]
+        # Sắp xếp đếm theo bậc
+        start = [0] * (max(degree, default=0) + 2)
+        for d in degree:
+            start[d + 1] += 1
+        for d in range(1, len(start)):
+            start[d] += start[d - 1]
+        fill = start[:]
+        vert = [0] * n
+        pos = [0] * n
+        for u in range(n):
+            d = degree[u]
+            pos[u] = fill[d]
+            vert[fill[d]] = u
+            fill[d] += 1
+
+        degeneracy = 0
+        for i in range(n):
+            node = vert[i] # Đỉnh bậc nhỏ nhất trong phần còn lại
+            d_node = degree[node]
+            if d_node > degeneracy:
+                degeneracy = d_node
+            for neighbor in adj_list[node]:
+                d = degree[neighbor]
+                if d > d_node: # Hàng xóm chưa gỡ: chuyển xuống bucket d - 1
+                    first = start[d]
+                    other = vert[first]
+                    if other != neighbor:
+                        p = pos[neighbor]
+                        vert[first], vert[p] = neighbor, other
+                        pos[neighbor], pos[other] = first, p
+                    start[d] = first + 1
+                    degree[neighbor] = d - 1
+        removal = vert
+        order = removal[::-1]
+
+        print(f"Thu tu smallest-last: degeneracy = {degeneracy} (so mau <= {degeneracy + 1})")
+
+        colors = _greedy_colors(adj_list, order, n)
+        self.result_colors = {node: colors[node] for node in order}
+        if history is not None:
+            for node in order:
+                history.append(node, colors[node])
+
+    def _improve(self, history, adj_list=None):
+        """
+        Pha cải thiện Iterated Greedy (Culberson): lặp lại việc tô tham lam theo thứ tự ghép các
+        lớp màu hiện tại (đảo ngược, lớp lớn trước hoặc ngẫu nhiên). Tô lại theo thứ tự như vậy
+        không bao giờ dùng nhiều màu hơn, và thường gộp bớt được lớp màu cao nhất.
+        Dừng khi hết improve_time giây. Lịch sử được ghi lại theo lần tô tốt nhất.
+        Returns: history.
+        """
+        self.improvement_log = []
+        if not self.improve_time or not self.result_colors:
+            return history
+        n = self.graph.n
+        if adj_list is None:
+            adj_list = self._adjacency()
+        rng = random.Random(self.seed)
+        t0 = time.perf_counter()
+        deadline = t0 + self.improve_time
+
+        colors = np.empty(n, dtype=np.int64)
+        colors[list(self.result_colors)] = list(self.result_colors.values())
+        best = int(colors.max()) + 1
+        best_order = list(self.result_colors)
+        best_colors = None
+        self.improvement_log.append((0.0, best))
+        print(f"Cai thien (Iterated Greedy, {self.improve_time}s): bat dau voi {best} mau")
+
+        iterations = 0
+        while time.perf_counter() < deadline and best > 1:
+            k = int(colors.max()) + 1
+            sizes = np.bincount(colors, minlength=k)
+            pick = rng.random()
+            if pick < 0.5:
+                rank = np.arange(k)[::-1]                # Đảo ngược thứ tự lớp
+            elif pick < 0.8:
+                rank = np.argsort(np.argsort(-sizes, kind='stable'), kind='stable') # Lớp lớn trước
+            else:
+                rank = np.array(rng.sample(range(k), k)) # Ngẫu nhiên
+            order = np.argsort(rank[colors], kind='stable').tolist()
+            new_colors = _greedy_colors(adj_list, order, n)
+            colors = np.array(new_colors, dtype=np.int64)
+            iterations += 1
+            used = int(colors.max()) + 1
+            if used < best:
+                best = used
+                best_order = order
+                best_colors = new_colors
+                elapsed = time.perf_counter() - t0
+                self.improvement_log.append((elapsed, best))
+                print(f"  {elapsed:7.2f}s: {best} mau")
+
+        if best_colors is not None: # Có cải thiện: thay kết quả và lịch sử
+            self.result_colors = {node: best_colors[node] for node in best_order}
+            if self.color_array is not None:
+                self.color_array = np.asarray(best_colors, dtype=np.int32)
+            if history is not None:
+                history.clear()
+                for node in best_order:
+                    history.append(node, best_colors[node])
+        print(f"Ket thuc cai thien: {best} mau sau {iterations} lan lap")
+        return history
+
+    def _solve_dsatur(self, adj_list, history):
+        """
+        Tô màu DSATUR. Mỗi bước O(bậc của đỉnh được tô): lấy đỉnh từ SaturationBuckets,
+        chọn màu nhỏ nhất chưa có ở hàng xóm, rồi tăng độ bão hòa của các hàng xóm chưa tô
+        lần đầu thấy màu này.
+        """
+        n = self.graph.n
+        degrees = [len(adj_list[u]) for u in range(n)]
+        distinct = sorted(set(degrees))
+        rank_of = {d: r for r, d in enumerate(distinct)}
+        queue = SaturationBuckets([rank_of[d] for d in degrees])
+        for u in range(n - 1, -1, -1): # Nạp ngược để khi hòa đỉnh chỉ số nhỏ được lấy trước
+            queue.push(u)
+
+        print(f"Che do DSATUR: chon dinh bao hoa nhat tai moi buoc ({n} dinh)")
+
+        colors = self.result_colors
+        seen = [set() for _ in range(n)] # Tập màu đã xuất hiện ở hàng xóm của từng đỉnh
+        while queue:
+            node = queue.pop()
+
+            # Màu nhỏ nhất chưa có ở hàng xóm
+            used = seen[node]
+            color_id = 0
+            while color_id in used:
+                color_id += 1
+            colors[node] = color_id
+            seen[node] = None # Giải phóng: đỉnh đã tô không cần nữa
+
+            # Cập nhật độ bão hòa của hàng xóm chưa tô
+            for neighbor in adj_list[node]:
+                neighbor_seen = seen[neighbor]
+                if neighbor_seen is not None and color_id not in neighbor_seen:
+                    neighbor_seen.add(color_id)
+                    queue.increase(neighbor)
+
+            if history is not None:
+                history.append(node, color_id)
+
+    def _solve_exact(self, adj_list, history):
+        """
+        Tô màu chính xác bằng nhánh cận DSATUR:
+            1. Cận trên: nghiệm DSATUR tham lam. Cận dưới: clique tìm tham lam, các đỉnh clique
+               được gán trước màu 0..q-1 (phá đối xứng).
+            2. Mỗi nút chọn đỉnh chưa tô có độ bão hòa lớn nhất (hòa: bậc lớn nhất trong phần
+               chưa tô), thử các màu đang dùng không xung đột rồi đến một màu mới, cắt nhánh
+               khi số màu không thể nhỏ hơn cận trên.
+            3. Kiểm tra xung đột bằng bitset: adj[v] & lớp_màu[c] (int Python làm bitset).
+        Hết time_limit thì dừng, giữ nghiệm tốt nhất (is_optimal=False nếu chưa chứng minh được).
+        Thời gian tính cả phần chuẩn bị: hạn chót được kiểm tra sau DSATUR, trong lúc dựng bitset
+        và tìm clique, ở mỗi nút nhánh và trong lúc chọn đỉnh. Riêng lượt DSATUR đầu (O(n + m))
+        luôn chạy hết để có nghiệm hợp lệ. Lịch sử ghi theo thứ tự gán của nghiệm.
+        """
+        n = self.graph.n
+        if n > self.EXACT_MAX_N:
+            raise ValueError(f"N={n} qua lon cho che do exact (toi da {self.EXACT_MAX_N})")
+        t0 = time.perf_counter()
+        deadline = t0 + self.time_limit
+
+        # --- CẬN TRÊN: DSATUR THAM LAM ---
+        greedy = ColoringHistory(n)
+        self._solve_dsatur(adj_list, greedy)
+        best_colors = dict(self.result_colors)
+        best_order = [node for node, _ in greedy.steps()]
+        upper = len(set(best_colors.values()))
+        # Cận dưới tầm thường, dùng khi hết giờ trước khi tìm được clique
+        lower = 0 if n == 0 else (2 if any(len(adj_list[u]) for u in range(n)) else 1)
+        timed_out = time.perf_counter() > deadline
+
+        # --- BITSET KỀ ---
+        adj = []
+        row = np.zeros(n, dtype=bool)
+        for u in range(n if not timed_out else 0):
+            if u & 255 == 0 and time.perf_counter() > deadline:
+                timed_out = True
+                break
+            row[:] = False
+            row[list(adj_list[u])] = True
+            row[u] = False # Bỏ khuyên nếu có
+            adj.append(int.from_bytes(np.packbits(row, bitorder='little').tobytes(), 'little'))
+        degrees = [_popcount(a) for a in adj]
+
+        # --- CẬN DƯỚI: CLIQUE THAM LAM ---
+        order = sorted(range(n), key=lambda v: degrees[v], reverse=True) if not timed_out else []
+        clique = []
+        for start in order:
+            if time.perf_counter() > deadline:
+                timed_out = True
+                break
+            if degrees[start] + 1 <= len(clique):
+                break # Các đỉnh sau bậc nhỏ hơn, không thể cho clique lớn hơn
+            candidate = [start]
+            cand = adj[start]
+            for v in order:
+                if cand >> v & 1:
+                    candidate.append(v)
+                    cand &= adj[v]
+                    if not cand:
+                        break
+            if len(candidate) > len(clique):
+                clique = candidate
+        lower = max(lower, len(clique))
+        print(f"Che do exact: can duoi (clique) = {lower}, can tren (DSATUR) = {upper}")
+
+        # --- NHÁNH CẬN ---
+        colors = [-1] * n
+        classes = [0] * (n + 1)  # Bitset các đỉnh của từng màu
+        uncolored = (1 << n) - 1
+        for c, v in enumerate(clique):
+            colors[v] = c
+            classes[c] |= 1 << v
+            uncolored &= ~(1 << v)
+        k = len(clique)          # Số màu đang dùng
+        colored = len(clique)
+        nodes = 0
+
+        def select():
+            """
+            Đỉnh chưa tô bão hòa nhất; trả về (đỉnh, độ bão hòa), hoặc (-1, None) nếu hết giờ
+            giữa chừng (mỗi lần chọn tốn O(n*k), có thể lâu với đồ thị lớn).
+            """
+            best, best_key = -1, None
+            rest = uncolored
+            scanned = 0
+            while rest:
+                scanned += 1
+                if scanned & 127 == 0 and time.perf_counter() > deadline:
+                    return -1, None
+                low = rest & -rest
+                v = low.bit_length() - 1
+                rest ^= low
+                a = adj[v]
+                sat = 0
+                for c in range(k):
+                    if a & classes[c]:
+                        sat += 1
+                key = (sat, _popcount(a & uncolored))
+                if best_key is None or key > best_key:
+                    best, best_key = v, key
+            return best, best_key[0]
+
+        def frame_for(v):
+            a = adj[v]
+            return [v, [c for c in range(k) if not a & classes[c]] + [k], 0]
+
+        stack = []
+        if not timed_out and colored < n and lower < upper:
+            v, sat = select()
+            if sat is None:
+                timed_out = True
+            elif not (sat == k and k + 1 >= upper):
+                stack.append(frame_for(v))
+        while stack:
+            nodes += 1
+            if time.perf_counter() > deadline: # Mỗi nút: select() đắt hơn nhiều so với phép đo giờ
+                timed_out = True
+                break
+            frame = stack[-1]
+            v, candidates, i = frame
+            c = colors[v]
+            if c >= 0: # Quay lui phép gán trước của đỉnh này
+                classes[c] ^= 1 << v
+                if not classes[c]:
+                    k -= 1
+                colors[v] = -1
+                uncolored |= 1 << v
+                colored -= 1
+            if i == len(candidates) or candidates[i] + 1 >= upper:
+                stack.pop() # Hết màu thử được (các màu còn lại không tốt hơn cận trên)
+                continue
+            frame[2] = i + 1
+            c = candidates[i]
+            colors[v] = c
+            if not classes[c]:
+                k += 1
+            classes[c] |= 1 << v
+            uncolored ^= 1 << v
+            colored += 1
+
+            if colored == n: # Nghiệm mới tốt hơn (nhánh đã bảo đảm k < upper)
+                upper = k
+                best_colors = {u: colors[u] for u in range(n)}
+                best_order = clique + [f[0] for f in stack]
+                if upper == lower:
+                    break
+                continue
+            w, sat = select()
+            if sat is None:
+                timed_out = True
+                break
+            if sat == k and k + 1 >= upper:
+                continue # Đỉnh w buộc phải mở màu mới: không thể tốt hơn cận trên
+            stack.append(frame_for(w))
 
-        return history
\ No newline at end of file
+        if not timed_out:
+            lower = upper # Duyệt hết (hoặc chạm cận dưới): nghiệm tốt nhất là tối ưu
+        self.result_colors = {u: best_colors[u] for u in best_order}
+        self.lower_bound = lower
+        self.is_optimal = upper == lower
+        self.search_nodes = nodes
+        elapsed = time.perf_counter() - t0
+        status = "toi uu" if self.is_optimal else f"het thoi gian, can duoi {lower}"
+        print(f"Ket qua exact: {upper} mau ({status}), {nodes} nut, {elapsed:.2f}s")
+
+        if history is not None:
+            for u in best_order:
+                history.append(u, best_colors[u])
+
+    def _solve_parallel(self, history):
+        """
+        Tô màu Jones-Plassmann với độ ưu tiên ngẫu nhiên, dạng đếm (mỗi cạnh chỉ được xử lý một lần):
+            1. Đếm cho mỗi đỉnh số hàng xóm ưu tiên cao hơn; đỉnh có số đếm 0 là sẵn sàng.
+            2. Mỗi vòng tô toàn bộ đỉnh sẵn sàng (một tập độc lập): chia thành các phần theo số cạnh,
+               các worker tính màu song song (_jp_color), chỉ đọc màu của các vòng trước.
+            3. Tiến trình chính ghi màu mới, trừ số đếm của các hàng xóm ưu tiên thấp hơn;
+               đỉnh về 0 là sẵn sàng ở vòng sau.
+        Mảng CSR, độ ưu tiên và màu nằm trong shared memory, worker không sao chép đồ thị.
+        """
+        n = self.graph.n
+        graph = self.graph if hasattr(self.graph, 'indptr') else self.graph.to_csr()
+        workers = self.workers or os.cpu_count() or 1
+        if shared_memory is None and workers > 1:
+            print("Python < 3.8 khong co multiprocessing.shared_memory: chay tai cho (1 worker)")
+            workers = 1
+        t0 = time.perf_counter()
+
+        arrays = [
+            np.asarray(graph.indptr, dtype=np.int64),
+            np.asarray(graph.indices, dtype=np.int32),
+            np.random.default_rng(self.seed).permutation(n).astype(np.int32), # Độ ưu tiên
+            np.full(n, -1, dtype=np.int32),                                   # Màu
+        ]
+        pieces = workers * 4 # Nhiều phần hơn worker để cân bằng tải
+
+        def split(vertices, degrees):
+            """Chia tập đỉnh thành các phần có số cạnh xấp xỉ nhau."""
+            if vertices.size <= 1 or pieces == 1:
+                return [vertices] if vertices.size else []
+            cuts = np.searchsorted(np.cumsum(degrees), np.linspace(0, degrees.sum(), pieces + 1)[1:-1])
+            return [part for part in np.split(vertices, np.unique(cuts)) if part.size]
+
+        pool = None
+        shared = None
+        segments = []
+        try:
+            if workers > 1:
+                spec = []
+                for k, array in enumerate(arrays):
+                    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+                    segments.append(shm)
+                    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+                    shared[...] = array
+                    arrays[k] = shared
+                    spec.append((shm.name, array.shape, array.dtype.str))
+                pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_jp_worker,
+                                           initargs=(spec,))
+            indptr, indices, priority, colors = arrays
+            degrees = np.diff(indptr)
+
+            # --- BƯỚC 1: ĐẾM HÀNG XÓM ƯU TIÊN CAO HƠN ---
+            bounds = [0] + [int(part[-1]) + 1 for part in split(np.arange(n), degrees)]
+            blocks = list(zip(bounds[:-1], bounds[1:]))
+            if pool is not None:
+                counts = list(pool.map(_jp_worker_count, blocks))
+            else:
+                counts = [_jp_count(indptr, indices, priority, lo, hi) for lo, hi in blocks]
+            waiting = np.concatenate(counts) if counts else np.zeros(0, dtype=np.int64)
+            ready = np.flatnonzero(waiting == 0)
+
+            # --- BƯỚC 2-3: CÁC VÒNG TẬP ĐỘC LẬP ---
+            rounds = 0
+            while ready.size:
+                parts = split(ready, degrees[ready])
+                if pool is not None:
+                    results = list(pool.map(_jp_worker_color, parts))
+                else:
+                    results = [_jp_color(indptr, indices, priority, colors, part) for part in parts]
+                successors = []
+                for part, (chosen, lower) in zip(parts, results):
+                    colors[part] = chosen
+                    successors.append(lower)
+                    if history is not None:
+                        history.extend(part, chosen)
+                successors = np.concatenate(successors)
+                waiting -= np.bincount(successors, minlength=n)
+                ready = successors[waiting[successors] == 0]
+                ready.sort()
+                if ready.size: # Một đỉnh có thể vừa mất nhiều đỉnh đi trước trong cùng vòng
+                    distinct = np.empty(ready.size, dtype=bool)
+                    distinct[0] = True
+                    np.not_equal(ready[1:], ready[:-1], out=distinct[1:])
+                    ready = ready[distinct]
+                rounds += 1
+            result = colors.copy()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            arrays = shared = indptr = indices = priority = colors = None # Nhả view trước khi đóng shared memory
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+
+        self.color_array = result
+        self.rounds = rounds
+        if history is not None: # Thứ tự tô của kết quả giống lịch sử
+            self.result_colors = dict(zip(history.nodes[:len(history)].tolist(),
+                                          history.colors[:len(history)].tolist()))
+        else:
+            self.result_colors = dict(enumerate(result.tolist()))
+        num_colors = int(result.max()) + 1 if n else 0
+        print(f"Che do parallel: {num_colors} mau, {rounds} vong, {workers} worker, "
+              f"{time.perf_counter() - t0:.2f}s")
+
+    def _adjacency(self):
+        """
+        Danh sách kề dạng chỉ số được: list các list với CSRGraph (cắt từ indptr/indices,
+        không dựng dict), adj_list với GraphMap.
+        """
+        if hasattr(self.graph, 'indptr'):
+            indptr = self.graph.indptr.tolist()
+            indices = self.graph.indices.tolist()
+            return [indices[indptr[u]:indptr[u + 1]] for u in range(self.graph.n)]
+        return self.graph.adj_list
@@ -1,10 +1,23 @@
 import networkx as nx
 import matplotlib.pyplot as plt
+import numpy as np
+import io
 import random
 import os
 import math
 from cores import OptimalColoringSolver
 
+# Định dạng file đồ thị nhị phân (CSRGraph.save / CSRGraph.load):
+#   byte 0-7:   GRAPH_MAGIC
+#   byte 8-31:  3 số uint64 little-endian: n, số phần tử indices (2m), phiên bản định dạng
+#   byte 64-:   indptr (n+1 số int64) rồi indices (2m số int32), có thể memory-map trực tiếp
+GRAPH_MAGIC = b'CSRGRAPH'
+GRAPH_HEADER_SIZE = 64
+GRAPH_FORMAT_VERSION = 1
+
+# Số byte đọc mỗi lần khi phân tích file cạnh (edge list / DIMACS)
+READ_CHUNK_SIZE = 1 << 22
+
 class GraphMap:
     """
     Đại diện cho đồ thị vô hướng.
@@ -13,6 +26,7 @@ class GraphMap:
         self.n = n
         self.adj_list = {}
         self.edges = []
+        self._edge_set = set() # Cạnh (min, max) đã có: kiểm tra trùng O(1); None = dựng lại khi cần
         if n > 0:
             self.reset_graph(n)
 
@@ -21,6 +35,7 @@ class GraphMap:
         self.n = n
         self.adj_list = {i: [] for i in range(n)}
         self.edges = []
+        self._edge_set = set()
 
     def add_edge(self, u, v):
         """
@@ -29,7 +44,11 @@ class GraphMap:
             u (int): Đỉnh nguồn.
             v (int): Đỉnh đích.
         """
-        if u != v and v not in self.adj_list[u]:
+        if self._edge_set is None: # Sau khi nạp hàng loạt: chỉ dựng tập cạnh khi thật sự thêm cạnh
+            self._edge_set = {(a, b) if a < b else (b, a) for a, b in self.edges}
+        key = (u, v) if u < v else (v, u)
+        if u != v and key not in self._edge_set:
+            self._edge_set.add(key)
             self.adj_list[u].append(v)
             self.adj_list[v].append(u)
             self.edges.append((u, v))
@@ -53,53 +72,385 @@ class GraphMap:
         Args:
             matrix (list of list of int): Ma trận kề NxN.
         """
+        matrix = np.asarray(matrix)
         n = len(matrix)
         self.reset_graph(n)
-        for r in range(n):
-            for c in range(r + 1, n): # Chỉ duyệt tam giác trên ma trận để tránh trùng lặp cạnh
-                if matrix[r][c] == 1:
-                    self.add_edge(r, c)
+        # Chỉ lấy tam giác trên ma trận để tránh trùng lặp cạnh (vector hóa, thứ tự theo hàng như cũ)
+        rows, cols = np.nonzero(np.triu(matrix == 1, 1))
+        self._set_edges(rows, cols)
+
+    def _set_edges(self, u, v):
+        """
+        Nạp hàng loạt các cạnh (u[i], v[i]) với u[i] < v[i], không trùng (ví dụ từ np.nonzero
+        tam giác trên hoặc CSRGraph.edge_array), thay cho gọi add_edge từng cạnh.
+        Danh sách kề được dựng qua CSR (sắp xếp vector hóa), cùng kết quả với vòng add_edge;
+        tập cạnh chống trùng chỉ được dựng lại nếu sau đó có add_edge.
+        """
+        self.adj_list = CSRGraph._from_unique_pairs(self.n, u, v).adj_list
+        self.edges = list(zip(u.tolist(), v.tolist()))
+        self._edge_set = None
+
+    def to_csr(self):
+        """
+        Chuyển sang dạng CSR gọn (CSRGraph) để tô màu đồ thị lớn.
+        Returns: CSRGraph cùng tập cạnh.
+        """
+        return CSRGraph.from_edges(self.n, self.edges)
 
-    def load_from_file(self, filepath):
+    def load_from_file(self, filepath, fmt=None):
         """
-        Đọc file input.txt.
-        Format:
+        Đọc file đồ thị, tự nhận dạng định dạng (xem detect_graph_format).
+        Format ma trận (input.txt):
             Dòng 1: N
             Các dòng sau: Ma trận kề NxN (các số cách nhau bởi khoảng trắng)
         Args:
-            filepath (str): Đường dẫn tới file input.txt.
+            filepath (str): Đường dẫn tới file.
+            fmt (str): 'matrix', 'edgelist', 'dimacs', 'binary' hoặc None để tự nhận dạng.
+        Returns: Số đỉnh N.
         """
-        if not os.path.exists(filepath):
-            raise FileNotFoundError(f"Khong tim thay file: {filepath}")
+        fmt = fmt or detect_graph_format(filepath)
+        if fmt == 'matrix':
+            self.load_from_matrix(read_matrix_file(filepath))
+            return self.n
+        graph = load_graph(filepath, fmt)
+        self.reset_graph(graph.n)
+        edges = graph.edge_array()
+        self._set_edges(edges[:, 0], edges[:, 1])
+        return self.n
+
+class CSRGraph:
+    """
+    Đồ thị vô hướng dạng CSR (Compressed Sparse Row) bằng mảng NumPy:
+        - indptr (n+1): danh sách kề của đỉnh u là indices[indptr[u]:indptr[u+1]] (tăng dần).
+        - indices (2m): các đỉnh kề, mỗi cạnh xuất hiện hai lần (u -> v và v -> u).
+    Bộ nhớ O(n + m), dựng vector hóa từ ma trận kề (np.nonzero) hoặc danh sách cạnh, bỏ trùng
+    và khuyên (u, u). Cùng giao diện n / edges / adj_list với GraphMap nên dùng thay được
+    cho OptimalColoringSolver và visualize_coloring_history.
+    """
+    def __init__(self, n, indptr, indices):
+        self.n = n
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self._edges = None
 
-        with open(filepath, 'r') as f:
-            lines = f.readlines()
+    @classmethod
+    def from_edges(cls, n, edges):
+        """
+        Dựng CSR từ danh sách cạnh (bỏ cạnh trùng và khuyên).
+        Args:
+            n (int): Số đỉnh.
+            edges: List tuple (u, v) hoặc mảng (m, 2).
+        """
+        pairs = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        lo = np.minimum(pairs[:, 0], pairs[:, 1])
+        hi = np.maximum(pairs[:, 0], pairs[:, 1])
+        # Bỏ trùng: mỗi cạnh một khóa u * n + v (u < v); sắp xếp rồi so sánh phần tử kề nhau
+        keys = np.sort(lo * n + hi)
+        if keys.size:
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        return cls._from_unique_pairs(n, keys // n, keys % n)
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """
+        Dựng CSR từ ma trận kề NxN (chỉ đọc tam giác trên, giống GraphMap.load_from_matrix).
+        """
+        matrix = np.asarray(matrix)
+        rows, cols = np.nonzero(matrix == 1)
+        upper = rows < cols
+        return cls._from_unique_pairs(len(matrix), rows[upper], cols[upper])
 
-        # Đọc N
+    @classmethod
+    def from_file(cls, filepath):
+        """
+        Đọc file ma trận kề (định dạng input.txt) theo từng dòng: chỉ giữ các cạnh của tam giác trên,
+        bộ nhớ O(n + m) thay vì O(n^2).
+        """
+        n, rows = iter_matrix_rows(filepath)
+        us, vs = [], []
+        for r, row in enumerate(rows):
+            cols = np.flatnonzero(row[r + 1:] == 1) + (r + 1)
+            if cols.size:
+                us.append(np.full(cols.size, r, dtype=np.int64))
+                vs.append(cols)
+        if not us:
+            return cls(n, np.zeros(n + 1, dtype=np.int64), np.zeros(0, dtype=np.int32))
+        return cls._from_unique_pairs(n, np.concatenate(us), np.concatenate(vs))
+
+    @classmethod
+    def _from_unique_pairs(cls, n, u, v):
+        src = np.concatenate((u, v))
+        dst = np.concatenate((v, u))
+        order = np.argsort(src * n + dst) # Sắp theo đỉnh nguồn, rồi đỉnh kề
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return cls(n, indptr, dst[order])
+
+    @property
+    def num_edges(self):
+        return len(self.indices) // 2
+
+    def save(self, filepath):
+        """
+        Lưu đồ thị ra file nhị phân (định dạng GRAPH_MAGIC): header 64 byte, rồi indptr và indices.
+        Đọc lại bằng CSRGraph.load không phải phân tích văn bản, có thể memory-map.
+        Args:
+            filepath (str): Đường dẫn file.
+        """
+        fields = np.array([self.n, len(self.indices), GRAPH_FORMAT_VERSION], dtype='<u8')
+        with open(filepath, 'wb') as f:
+            f.write(GRAPH_MAGIC)
+            f.write(fields.tobytes().ljust(GRAPH_HEADER_SIZE - len(GRAPH_MAGIC), b'\0'))
+            f.write(np.ascontiguousarray(self.indptr, dtype='<i8').tobytes())
+            f.write(np.ascontiguousarray(self.indices, dtype='<i4').tobytes())
+
+    @classmethod
+    def load(cls, filepath, mmap_mode='r'):
+        """
+        Đọc đồ thị nhị phân đã lưu bằng save().
+        Args:
+            filepath (str): Đường dẫn file.
+            mmap_mode: 'r' - memory-map chỉ đọc (nạp tức thì), None - đọc toàn bộ vào RAM.
+        Returns: CSRGraph.
+        """
+        with open(filepath, 'rb') as f:
+            raw = f.read(GRAPH_HEADER_SIZE)
+        if len(raw) < GRAPH_HEADER_SIZE or not raw.startswith(GRAPH_MAGIC):
+            raise ValueError(f"File khong dung dinh dang do thi nhi phan: {filepath}")
+        fields = np.frombuffer(raw[len(GRAPH_MAGIC):len(GRAPH_MAGIC) + 24], dtype='<u8')
+        n, nnz, version = (int(v) for v in fields)
+        if version != GRAPH_FORMAT_VERSION:
+            raise ValueError(f"Phien ban dinh dang do thi khong ho tro: {version}")
+
+        indices_offset = GRAPH_HEADER_SIZE + 8 * (n + 1)
+        if mmap_mode is None:
+            indptr = np.fromfile(filepath, dtype='<i8', count=n + 1, offset=GRAPH_HEADER_SIZE)
+            indices = np.fromfile(filepath, dtype='<i4', count=nnz, offset=indices_offset)
+        else:
+            indptr = np.memmap(filepath, dtype='<i8', mode=mmap_mode, offset=GRAPH_HEADER_SIZE, shape=(n + 1,))
+            indices = np.memmap(filepath, dtype='<i4', mode=mmap_mode, offset=indices_offset, shape=(nnz,))
+        graph = cls.__new__(cls)
+        graph.n = n
+        graph.indptr = indptr
+        graph.indices = indices
+        graph._edges = None
+        return graph
+
+    def degrees(self):
+        """Returns: np.ndarray bậc của từng đỉnh."""
+        return np.diff(self.indptr)
+
+    def neighbors(self, u):
+        """Returns: np.ndarray các đỉnh kề u (view, không sao chép)."""
+        return self.indices[self.indptr[u]:self.indptr[u + 1]]
+
+    def edge_array(self):
+        """Returns: np.ndarray (m, 2) các cạnh (u, v) với u < v."""
+        src = np.repeat(np.arange(self.n, dtype=np.int32), self.degrees())
+        upper = src < self.indices
+        return np.stack((src[upper], self.indices[upper]), axis=1)
+
+    @property
+    def edges(self):
+        """Danh sách tuple (u, v), u < v (tạo khi cần, dùng cho networkx)."""
+        if self._edges is None:
+            self._edges = [tuple(e) for e in self.edge_array().tolist()]
+        return self._edges
+
+    @property
+    def adj_list(self):
+        """Dict {u: [v, ...]} tương thích GraphMap (tạo mới mỗi lần, O(n + m))."""
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        return {u: indices[indptr[u]:indptr[u + 1]] for u in range(self.n)}
+
+def _bad_matrix_token(line):
+    """Token đầu tiên của dòng ma trận không đọc được thành số nguyên int8 (chỉ gọi khi đã có lỗi)."""
+    for token in line.split():
         try:
-            n = int(lines[0].strip())
-        except ValueError:
-            raise ValueError("Dong dau tien phai la so nguyen N")
+            np.array([token], dtype=np.int8)
+        except (ValueError, OverflowError):
+            return token
+    return '?'
 
-        # Đọc ma trận
-        matrix = []
-        # Bắt đầu đọc từ dòng thứ 2 (index 1) và bỏ qua các dòng trống nếu có
-        valid_lines = [line.strip() for line in lines[1:] if line.strip()]
+def iter_matrix_rows(filepath):
+    """
+    Đọc file ma trận kề theo từng dòng (không giữ cả file hay cả ma trận trong bộ nhớ).
+    Format:
+        Dòng 1: N
+        Các dòng sau: Ma trận kề NxN (các số cách nhau bởi khoảng trắng)
+    Args:
+        filepath (str): Đường dẫn tới file.
+    Returns: (n, rows) - rows là generator sinh N mảng NumPy int8 (mỗi dòng ma trận một mảng).
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Khong tim thay file: {filepath}")
+
+    f = open(filepath, 'r')
+    try:
+        n = int(f.readline().strip())
+    except ValueError:
+        f.close()
+        raise ValueError("Dong dau tien phai la so nguyen N")
+
+    def rows():
+        with f:
+            i = 0
+            for line in f:
+                if i == n:
+                    break
+                if not line.strip(): # Bỏ qua các dòng trống nếu có
+                    continue
+                # Phân tích cả dòng trong C (np.loadtxt báo lỗi với token sai, không cắt cụt như
+                # np.fromstring), chỉ tách token bằng Python khi cần chỉ ra token gây lỗi
+                try:
+                    row = np.loadtxt(io.StringIO(line), dtype=np.int8, ndmin=1)
+                except ValueError:
+                    raise ValueError(f"Dong ma tran thu {i+1} chua gia tri khong hop le: "
+                                     f"'{_bad_matrix_token(line)}'")
+                if row.size != n:
+                    raise ValueError(f"Dong ma tran thu {i+1} khong du {n} cot")
+                yield row
+                i += 1
+            if i != n:
+                raise ValueError(f"File khong du {n} dong ma tran")
+
+    return n, rows()
+
+def read_matrix_file(filepath):
+    """
+    Đọc file ma trận kề (định dạng input.txt).
+    Returns: np.ndarray int8 (N, N).
+    """
+    n, rows = iter_matrix_rows(filepath)
+    matrix = np.zeros((n, n), dtype=np.int8)
+    for i, row in enumerate(rows):
+        matrix[i] = row
+    return matrix
 
-        for i in range(n):
-            if i >= len(valid_lines):
+def detect_graph_format(filepath):
+    """
+    Nhận dạng định dạng file đồ thị từ phần đầu file.
+        - 'binary':   bắt đầu bằng GRAPH_MAGIC (CSRGraph.save).
+        - 'dimacs':   DIMACS .col - các dòng 'c ...' (chú thích), 'p edge N M', 'e u v' (đỉnh đánh số từ 1).
+        - 'matrix':   dòng đầu là một số N, các dòng sau là ma trận kề NxN (input.txt).
+        - 'edgelist': mỗi dòng một cạnh 'u v' (đỉnh đánh số từ 0), dòng bắt đầu bằng '#' hoặc '%' là chú thích.
+    Args:
+        filepath (str): Đường dẫn file.
+    Returns: Tên định dạng.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Khong tim thay file: {filepath}")
+    with open(filepath, 'rb') as f:
+        head = f.read(len(GRAPH_MAGIC))
+        if head == GRAPH_MAGIC:
+            return 'binary'
+    with open(filepath, 'r') as f:
+        for line in f:
+            tokens = line.split()
+            if not tokens or tokens[0][0] in '#%':
+                continue
+            if tokens[0] in ('c', 'p', 'e'):
+                return 'dimacs'
+            return 'matrix' if len(tokens) == 1 else 'edgelist'
+    raise ValueError(f"File rong: {filepath}")
+
+def _iter_line_chunks(filepath):
+    """Đọc file văn bản theo khối READ_CHUNK_SIZE byte, mỗi khối kết thúc ở cuối một dòng."""
+    with open(filepath, 'r') as f:
+        rest = ''
+        while True:
+            data = f.read(READ_CHUNK_SIZE)
+            if not data:
                 break
-            row_str = valid_lines[i]
-            row = [int(x) for x in row_str.split()]
-            if len(row) != n:
-                raise ValueError(f"Dong ma tran thu {i+1} khong du {n} cot")
-            matrix.append(row)
-
-        if len(matrix) != n:
-            raise ValueError(f"File khong du {n} dong ma tran")
+            data = rest + data
+            cut = data.rfind('\n') + 1
+            if cut == 0:
+                rest = data
+                continue
+            rest = data[cut:]
+            yield data[:cut]
+        if rest:
+            yield rest
+
+def _bad_edge_line(text):
+    """Tìm dòng cạnh đầu tiên không có ít nhất 2 chỉ số đỉnh nguyên (chỉ gọi khi đã có lỗi)."""
+    for line in text.splitlines():
+        tokens = line.split('#')[0].split('%')[0].split()
+        if not tokens:
+            continue
+        if len(tokens) < 2 or not all(t.lstrip('-').isdigit() for t in tokens[:2]):
+            return line.strip()
+    return '?'
+
+def iter_edge_chunks(filepath, fmt):
+    """
+    Phân tích file cạnh theo từng khối, mỗi khối trả về một mảng cạnh (k, 2) int64 (đỉnh từ 0).
+    Args:
+        filepath (str): Đường dẫn file.
+        fmt (str): 'edgelist' hoặc 'dimacs'.
+    Yields: ('n', N) khi gặp dòng 'p' của DIMACS, rồi ('edges', mảng cạnh) cho từng khối.
+    """
+    for chunk in _iter_line_chunks(filepath):
+        if fmt == 'dimacs':
+            lines = []
+            for line in chunk.splitlines():
+                if line.startswith('e'):
+                    lines.append(line[1:])
+                elif line.startswith('p'):
+                    tokens = line.split()
+                    if len(tokens) < 3:
+                        raise ValueError(f"Dong 'p' khong hop le: {line.strip()}")
+                    yield 'n', int(tokens[2])
+            text = '\n'.join(lines)
+        else:
+            text = chunk
+        if not text.strip():
+            continue
+        # Phân tích theo từng dòng (trong C), chỉ lấy 2 cột đầu: cột trọng số 'u v w' được bỏ qua
+        try:
+            edges = np.loadtxt(io.StringIO(text), dtype=np.int64, usecols=(0, 1), ndmin=2,
+                               comments=('#', '%'))
+        except ValueError:
+            raise ValueError(f"File canh co dong khong hop le: '{_bad_edge_line(text)}' ({filepath})")
+        if fmt == 'dimacs':
+            edges -= 1 # DIMACS đánh số đỉnh từ 1
+        yield 'edges', edges
 
-        self.load_from_matrix(matrix)
-        return n
+def load_graph(filepath, fmt=None, n=None):
+    """
+    Nạp đồ thị (dạng CSRGraph) từ file, tự nhận dạng định dạng nếu fmt=None.
+    File cạnh được đọc theo khối: bộ nhớ tỉ lệ với số cạnh, không phụ thuộc N^2.
+    Args:
+        filepath (str): Đường dẫn file.
+        fmt (str): 'matrix', 'edgelist', 'dimacs', 'binary' hoặc None.
+        n (int): Số đỉnh (edge list không có header: mặc định là chỉ số đỉnh lớn nhất + 1).
+    Returns: CSRGraph.
+    """
+    fmt = fmt or detect_graph_format(filepath)
+    if fmt == 'binary':
+        return CSRGraph.load(filepath)
+    if fmt == 'matrix':
+        return CSRGraph.from_file(filepath)
+    if fmt not in ('edgelist', 'dimacs'):
+        raise ValueError(f"Dinh dang khong ho tro: {fmt}")
+
+    parts = []
+    for kind, value in iter_edge_chunks(filepath, fmt):
+        if kind == 'n':
+            n = value if n is None else n
+        else:
+            parts.append(value)
+    edges = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.int64)
+    if edges.size and edges.min() < 0:
+        raise ValueError(f"Chi so dinh am trong file: {filepath}")
+    max_id = int(edges.max()) + 1 if edges.size else 0
+    if n is None:
+        n = max_id
+    elif max_id > n:
+        raise ValueError(f"Chi so dinh {max_id - 1} vuot qua so dinh N={n}")
+    return CSRGraph.from_edges(n, edges)
 
 # --- HAM HIEN THI ---
 def visualize_coloring_history(graph_map, history, custom_palette=None, max_cols=3):
@@ -107,7 +458,7 @@ def visualize_coloring_history(graph_map, history, custom_palette=None, max_cols
     Hiển thị quá trình tô màu đồ thị từng bước.
     Args:
         graph_map (GraphMap): Đồ thị cần tô màu.
-        history (list of dicts): Lịch sử các bước tô màu.
+        history (ColoringHistory): Lịch sử các bước tô màu (nhật ký (node, color)).
         max_cols (int): Số cột tối đa trong lưới vẽ.
     '''
     n = graph_map.n # Số đỉnh
@@ -144,9 +495,11 @@ def visualize_coloring_history(graph_map, history, custom_palette=None, max_cols
         color_palette = plt.cm.tab20.colors
 
     # --- VẼ TỪNG BƯỚC ---
-    for idx, step_idx in enumerate(indices_to_draw):
+    # Trạng thái được dựng dần từ nhật ký: mỗi bước chỉ áp thêm một cặp (node, color)
+    current_colors_dict = {}
+    for idx, (step_idx, (last_node, last_color_id)) in enumerate(zip(indices_to_draw, history.steps())):
         ax = axes_flat[idx]
-        current_colors_dict = history[step_idx]
+        current_colors_dict[last_node] = last_color_id
 
         node_color_list = []
         for node in G.nodes():
@@ -163,9 +516,6 @@ def visualize_coloring_history(graph_map, history, custom_palette=None, max_cols
                 edge_color='gray', node_size=600, font_color='white', font_weight='bold')
 
         # Tiêu đề
-        last_node = list(current_colors_dict.keys())[-1]
-        last_color_id = current_colors_dict[last_node]
-
         # Lấy tên màu (nếu là string) hoặc mã màu
         color_name = str(color_palette[last_color_id % len(color_palette)])
         # Rút gọn nếu là mã hex hoặc tuple rgb
@@ -199,25 +549,33 @@ def visualize_coloring_history(graph_map, history, custom_palette=None, max_cols
 
 # --- HAM CHAY CHINH ---
 class ColoringController:
+    # Ngưỡng số đỉnh: lớn hơn thì tắt lịch sử / bỏ vẽ từng bước, và không in bảng từng đỉnh
+    HISTORY_MAX_N = 25
+    TABLE_MAX_N = 200
+
     def run_coloring_interactive(self):
         print("=== CAU HINH TO MAU DO THI ===")
         print("1. Nhan nut [R]: Random (Ngau nhien - Chi danh cho N < 25)")
-        print("2. Nhan nut [F]: File (Doc tu input.txt)")
+        print("2. Nhan nut [F]: File (Ma tran ke input.txt, edge list, DIMACS .col hoac file nhi phan)")
 
         mode = input("Chon che do (R/F): ").strip().upper()
         graph = GraphMap()
 
         try:
             if mode == 'F':
-                filepath = "input.txt"
+                val_path = input("Nhap duong dan file (Mac dinh input.txt): ").strip()
+                filepath = val_path or "input.txt"
                 if not os.path.exists(filepath):
                     print(f"Khong tim thay file '{filepath}'.")
                     return
 
-                print(f"Dang doc file '{filepath}'...")
-                n = graph.load_from_file(filepath)
-                print(f"Doc thanh cong do thi N={n}")
-                method_str = "File Input"
+                fmt = detect_graph_format(filepath)
+                print(f"Dang doc file '{filepath}' (dinh dang: {fmt})...")
+                # Giữ nguyên dạng CSRGraph từ bộ đọc theo khối (không dựng lại GraphMap từng cạnh):
+                # solver và visualize_coloring_history đều nhận trực tiếp CSRGraph
+                graph = load_graph(filepath, fmt)
+                print(f"Doc thanh cong do thi N={graph.n}")
+                method_str = f"File Input ({fmt})"
 
             else: # Mode Random
                 val_n = input("Nhap so dinh N (< 25): ")
@@ -239,26 +597,53 @@ class ColoringController:
             print("-" * 40)
             print("THONG TIN DO THI:")
             print(f"   - So dinh (N):   {graph.n}")
-            print(f"   - So canh (E):   {len(graph.edges)}")
+            num_edges = graph.num_edges if hasattr(graph, 'num_edges') else len(graph.edges)
+            print(f"   - So canh (E):   {num_edges}")
             print(f"   - Nguon du lieu: {method_str}")
             print("-" * 40)
 
-            print("Dang chay thuat toan to mau do thi toi uu...")
-            solver = OptimalColoringSolver(graph)
-            history = solver.solve()
+            val_s = input("Chon chien luoc: [D] Bac giam dan / [S] DSATUR / [L] Smallest-last / [E] Chinh xac"
+                          " / [P] Song song (Mac dinh S): ").strip().upper()
+            strategy = {'D': 'degree', 'L': 'smallest_last', 'E': 'exact', 'P': 'parallel'}.get(val_s, 'dsatur')
+            time_limit = 10.0
+            improve_time = 0
+            if strategy == 'exact':
+                val_t = input("Nhap gioi han thoi gian (giay, Mac dinh 10): ").strip()
+                time_limit = float(val_t) if val_t else 10.0
+            else:
+                val_t = input("Thoi gian cai thien Iterated Greedy (giay, Mac dinh 0 = bo qua): ").strip()
+                improve_time = float(val_t) if val_t else 0
 
-            final_state = history[-1]
+            print(f"Dang chay thuat toan to mau do thi toi uu ({strategy})...")
+            solver = OptimalColoringSolver(graph, strategy=strategy, time_limit=time_limit,
+                                           improve_time=improve_time)
+            record_history = graph.n < self.HISTORY_MAX_N
+            history = solver.solve(record_history=record_history)
+
+            final_state = solver.result_colors
             num_colors = len(set(final_state.values()))
 
             # --- IN KẾT QUẢ DẠNG TEXT ---
             print("\n" + "="*50)
             print(f"{'DINH':<6} | {'MAU TO (ID)':<15}")
             print("-" * 50)
-            for node in range(graph.n):
-                color = final_state.get(node, "Chua to")
-                print(f"{node:<6} | {color:<15}")
+            if graph.n <= self.TABLE_MAX_N:
+                for node in range(graph.n):
+                    color = final_state.get(node, "Chua to")
+                    print(f"{node:<6} | {color:<15}")
+            else:
+                print(f"(Bo qua bang chi tiet: N={graph.n} > {self.TABLE_MAX_N})")
             print("="*50)
             print(f"-> TONG SO MAU SU DUNG: {num_colors}")
+            if strategy == 'exact':
+                if solver.is_optimal:
+                    print("-> Da chung minh toi uu.")
+                else:
+                    print(f"-> Chua chung minh toi uu: can duoi {solver.lower_bound} mau.")
+
+            if not record_history:
+                print(f"N={graph.n} qua lon de ve tung buoc (N >= {self.HISTORY_MAX_N}), bo qua phan ve.")
+                return
 
             # --- TÙY CHỌN MÀU SẮC ---
             print("\n=== TUY CHON MAU SAC HIEN THI ===")